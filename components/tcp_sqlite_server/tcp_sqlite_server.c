@@ -1,6 +1,7 @@
 #include "tcp_sqlite_server.h"
 
 #include <string.h>
+#include <ctype.h>
 #include <stdlib.h>
 #include <stdio.h>
 #include <errno.h>
@@ -20,6 +21,7 @@ typedef struct {
   sqlite3_stmt* stmt;
   int col_count;
   char** col_names;    // allocated per stmt
+  bool done;           // last step hit SQLITE_DONE; cleared by reset
 } stmt_slot_t;
 
 typedef struct {
@@ -56,6 +58,7 @@ static stmt_slot_t* alloc_slot(client_ctx_t* c) {
       c->slots[i].stmt = NULL;
       c->slots[i].col_count = 0;
       c->slots[i].col_names = NULL;
+      c->slots[i].done = false;
       return &c->slots[i];
     }
   }
@@ -70,6 +73,7 @@ static void release_slot(stmt_slot_t* s) {
   }
   free_col_names(s);
   s->col_count = 0;
+  s->done = false;
   s->id = 0;
   s->in_use = 0;
 }
@@ -84,13 +88,27 @@ static int send_json_line(int sock, const cJSON* obj, int tx_max) {
     return -1;
   }
 
-  // add newline
-  int rc = send(sock, txt, len, 0);
-  if (rc > 0) {
-    send(sock, "\n", 1, 0);
+  // append the newline so the line goes out in one send() (a separate 1-byte
+  // send gets held back by Nagle until the previous segment is ACKed)
+  char* line = (char*)realloc(txt, len + 2);
+  if (!line) {
+    free(txt);
+    return -1;
+  }
+  line[len++] = '\n';
+  line[len] = 0;
+
+  size_t off = 0;
+  while (off < len) {
+    int rc = send(sock, line + off, len - off, 0);
+    if (rc <= 0) {
+      free(line);
+      return -1;
+    }
+    off += (size_t)rc;
   }
-  free(txt);
-  return rc;
+  free(line);
+  return (int)len;
 }
 
 static cJSON* make_err(int code, const char* msg) {
@@ -348,6 +366,16 @@ static void handle_step(client_ctx_t* c, cJSON* req) {
     return;
   }
 
+  // Stay done until reset: sqlite3_step() would auto-reset and restart the query,
+  // which breaks clients that pipeline steps past the last row.
+  if (slot->done) {
+    cJSON* resp = make_ok();
+    cJSON_AddBoolToObject(resp, "done", true);
+    send_json_line(c->sock, resp, c->cfg.tx_line_max);
+    cJSON_Delete(resp);
+    return;
+  }
+
   if (xSemaphoreTake(c->db_mutex, pdMS_TO_TICKS(5000)) != pdTRUE) {
     cJSON* e = make_err(500, "db mutex timeout");
     send_json_line(c->sock, e, c->cfg.tx_line_max);
@@ -362,11 +390,12 @@ static void handle_step(client_ctx_t* c, cJSON* req) {
   if (rc == SQLITE_ROW) {
     int cols = sqlite3_column_count(slot->stmt);
     cJSON* row = cJSON_CreateArray();
-    cJSON* types = cJSON_CreateArray();
+    // "types": false in the request leaves the types array out (smaller row responses)
+    cJSON* types = json_get_bool(req, "types", true) ? cJSON_CreateArray() : NULL;
 
     for (int i = 0; i < cols; i++) {
       int t = sqlite3_column_type(slot->stmt, i);
-      cJSON_AddItemToArray(types, cJSON_CreateString(sqlite_type_to_str(t)));
+      if (types) cJSON_AddItemToArray(types, cJSON_CreateString(sqlite_type_to_str(t)));
 
       if (t == SQLITE_NULL) {
         cJSON_AddItemToArray(row, cJSON_CreateNull());
@@ -377,8 +406,9 @@ static void handle_step(client_ctx_t* c, cJSON* req) {
       }
     }
     cJSON_AddItemToObject(resp, "row", row);
-    cJSON_AddItemToObject(resp, "types", types);
+    if (types) cJSON_AddItemToObject(resp, "types", types);
   } else if (rc == SQLITE_DONE) {
+    slot->done = true;
     cJSON_AddBoolToObject(resp, "done", true);
   } else {
     char msg[256];
@@ -421,6 +451,7 @@ static void handle_reset(client_ctx_t* c, cJSON* req) {
 
   int rc1 = sqlite3_reset(slot->stmt);
   int rc2 = SQLITE_OK;
+  slot->done = false;
   if (clear_binds) rc2 = sqlite3_clear_bindings(slot->stmt);
 
   xSemaphoreGive(c->db_mutex);
@@ -472,6 +503,331 @@ static void handle_finalize(client_ctx_t* c, cJSON* req) {
   cJSON_Delete(resp);
 }
 
+// Only plain identifiers may be spliced into generated SQL
+static bool is_identifier(const char* s) {
+  if (!s || s[0] == 0) return false;
+  for (const char* p = s; *p; p++) {
+    if (!isalnum((unsigned char)*p) && *p != '_') return false;
+  }
+  return true;
+}
+
+// JSON value -> sqlite bind. Strings are bound SQLITE_STATIC: the request JSON outlives the step.
+static int bind_json_value(sqlite3_stmt* stmt, int index, cJSON* v) {
+  if (cJSON_IsNull(v)) return sqlite3_bind_null(stmt, index);
+  if (cJSON_IsBool(v)) return sqlite3_bind_int(stmt, index, cJSON_IsTrue(v) ? 1 : 0);
+  if (cJSON_IsNumber(v)) {
+    double d = v->valuedouble;
+    // Cast only inside the int64 range: converting NaN, inf or |d| >= 2^63 is undefined behaviour
+    if (d >= -9223372036854775808.0 && d < 9223372036854775808.0 && d == (double)(sqlite3_int64)d) {
+      return sqlite3_bind_int64(stmt, index, (sqlite3_int64)d);
+    }
+    return sqlite3_bind_double(stmt, index, d);
+  }
+  if (cJSON_IsString(v)) return sqlite3_bind_text(stmt, index, v->valuestring, -1, SQLITE_STATIC);
+  return SQLITE_MISMATCH;
+}
+
+// "replace"/"ignore"/NULL -> INSERT verb, NULL for anything else
+static const char* conflict_verb(const char* conflict) {
+  if (!conflict) return "INSERT";
+  if (strcmp(conflict, "replace") == 0) return "INSERT OR REPLACE";
+  if (strcmp(conflict, "ignore") == 0) return "INSERT OR IGNORE";
+  return NULL;
+}
+
+// "<verb> INTO <table> (c1,c2,...) VALUES (?,?,...)", malloc'd. NULL on bad column name (*bad_col set) or no mem.
+static char* build_insert_sql(const char* verb, const char* table, cJSON* columns, bool* bad_col) {
+  int ncols = cJSON_GetArraySize(columns);
+  size_t cap = strlen(verb) + strlen(table) + 24;
+  cJSON* col = NULL;
+  *bad_col = false;
+  cJSON_ArrayForEach(col, columns) {
+    if (!cJSON_IsString(col) || !is_identifier(col->valuestring)) {
+      *bad_col = true;
+      return NULL;
+    }
+    cap += strlen(col->valuestring) + 3;
+  }
+
+  char* sql = (char*)malloc(cap);
+  if (!sql) return NULL;
+
+  int len = snprintf(sql, cap, "%s INTO %s (", verb, table);
+  int i = 0;
+  cJSON_ArrayForEach(col, columns) {
+    len += snprintf(sql + len, cap - len, "%s%s", i++ ? "," : "", col->valuestring);
+  }
+  len += snprintf(sql + len, cap - len, ") VALUES (");
+  for (i = 0; i < ncols; i++) {
+    len += snprintf(sql + len, cap - len, "%s?", i ? "," : "");
+  }
+  snprintf(sql + len, cap - len, ")");
+  return sql;
+}
+
+static void handle_bulk_insert(client_ctx_t* c, cJSON* req) {
+  const char* table = json_get_string(req, "table");
+  cJSON* columns = cJSON_GetObjectItem(req, "columns");
+  cJSON* rows = cJSON_GetObjectItem(req, "rows");
+  int ncols = cJSON_IsArray(columns) ? cJSON_GetArraySize(columns) : 0;
+
+  if (!is_identifier(table) || ncols <= 0 || !cJSON_IsArray(rows)) {
+    cJSON* e = make_err(400, "missing/invalid table/columns/rows");
+    send_json_line(c->sock, e, c->cfg.tx_line_max);
+    cJSON_Delete(e);
+    return;
+  }
+
+  const char* verb = conflict_verb(json_get_string(req, "conflict"));
+  if (!verb) {
+    cJSON* e = make_err(400, "invalid conflict (replace|ignore)");
+    send_json_line(c->sock, e, c->cfg.tx_line_max);
+    cJSON_Delete(e);
+    return;
+  }
+
+  bool bad_col = false;
+  char* sql = build_insert_sql(verb, table, columns, &bad_col);
+  if (!sql) {
+    cJSON* e = bad_col ? make_err(400, "invalid column name") : make_err(500, "no mem");
+    send_json_line(c->sock, e, c->cfg.tx_line_max);
+    cJSON_Delete(e);
+    return;
+  }
+
+  if (xSemaphoreTake(c->db_mutex, pdMS_TO_TICKS(5000)) != pdTRUE) {
+    free(sql);
+    cJSON* e = make_err(500, "db mutex timeout");
+    send_json_line(c->sock, e, c->cfg.tx_line_max);
+    cJSON_Delete(e);
+    return;
+  }
+
+  // prepare once, then bind/step/reset per row
+  sqlite3_stmt* stmt = NULL;
+  int rc = sqlite3_prepare_v2(c->db, sql, -1, &stmt, NULL);
+  free(sql);
+
+  int err_code = 0;
+  char msg[256];
+  int done_rows = 0;
+  int changes = 0;
+
+  if (rc != SQLITE_OK || !stmt) {
+    err_code = 500;
+    snprintf(msg, sizeof(msg), "sqlite rc=%d: %s", rc, sqlite3_errmsg(c->db));
+  } else {
+    cJSON* row = NULL;
+    cJSON_ArrayForEach(row, rows) {
+      if (!cJSON_IsArray(row) || cJSON_GetArraySize(row) != ncols) {
+        err_code = 400;
+        snprintf(msg, sizeof(msg), "row %d: expected %d values", done_rows, ncols);
+        break;
+      }
+
+      int idx = 1;
+      cJSON* v = NULL;
+      rc = SQLITE_OK;
+      cJSON_ArrayForEach(v, row) {
+        rc = bind_json_value(stmt, idx++, v);
+        if (rc != SQLITE_OK) break;
+      }
+      if (rc == SQLITE_OK) {
+        rc = sqlite3_step(stmt);
+        if (rc == SQLITE_DONE) {
+          rc = SQLITE_OK;
+          changes += sqlite3_changes(c->db);
+        }
+      }
+      if (rc != SQLITE_OK) {
+        err_code = 500;
+        snprintf(msg, sizeof(msg), "row %d: sqlite rc=%d: %s", done_rows, rc, sqlite3_errmsg(c->db));
+      }
+
+      sqlite3_reset(stmt);
+      sqlite3_clear_bindings(stmt);
+      if (err_code) break;
+      done_rows++;
+    }
+  }
+
+  sqlite3_int64 last_id = sqlite3_last_insert_rowid(c->db);
+  if (stmt) sqlite3_finalize(stmt);
+
+  xSemaphoreGive(c->db_mutex);
+
+  cJSON* resp = NULL;
+  if (err_code) {
+    resp = make_err(err_code, msg);
+  } else {
+    resp = make_ok();
+    cJSON_AddNumberToObject(resp, "rows", done_rows);
+    cJSON_AddNumberToObject(resp, "changes", changes);
+    cJSON_AddNumberToObject(resp, "last_insert_rowid", (double)last_id);
+  }
+  send_json_line(c->sock, resp, c->cfg.tx_line_max);
+  cJSON_Delete(resp);
+}
+
+// Split the next CSV field off *pp in place: quotes removed, "" -> ".
+// Returns the field start; *eol is set when the field ended the record.
+static char* csv_next_field(char** pp, char delim, bool* eol) {
+  char* p = *pp;
+  char* out = p;
+  char* start = p;
+  *eol = false;
+
+  if (*p == '"') {
+    p++;
+    for (;;) {
+      if (*p == 0) break;
+      if (*p == '"') {
+        if (p[1] == '"') {
+          *out++ = '"';
+          p += 2;
+          continue;
+        }
+        p++;
+        break;
+      }
+      *out++ = *p++;
+    }
+  }
+  while (*p && *p != delim && *p != '\n' && *p != '\r') {
+    *out++ = *p++;
+  }
+
+  if (*p == '\r') p++;
+  if (*p == '\n' || *p == 0) {
+    *eol = true;
+    if (*p) p++;
+  } else {
+    p++;  // delim
+  }
+  *out = 0;
+  *pp = p;
+  return start;
+}
+
+// Like bulk_insert, but the rows come as CSV text (one record per line, no header). All fields bind as text,
+// column affinity does the rest (same as the sqlite3 shell's .import).
+static void handle_import_csv(client_ctx_t* c, cJSON* req) {
+  const char* table = json_get_string(req, "table");
+  const char* csv = json_get_string(req, "csv");
+  const char* delim_s = json_get_string(req, "delim");
+  cJSON* columns = cJSON_GetObjectItem(req, "columns");
+  int ncols = cJSON_IsArray(columns) ? cJSON_GetArraySize(columns) : 0;
+  char delim = (delim_s && strlen(delim_s) == 1) ? delim_s[0] : ',';
+
+  if (!is_identifier(table) || ncols <= 0 || !csv || (delim_s && strlen(delim_s) != 1)) {
+    cJSON* e = make_err(400, "missing/invalid table/columns/csv/delim");
+    send_json_line(c->sock, e, c->cfg.tx_line_max);
+    cJSON_Delete(e);
+    return;
+  }
+
+  const char* verb = conflict_verb(json_get_string(req, "conflict"));
+  if (!verb) {
+    cJSON* e = make_err(400, "invalid conflict (replace|ignore)");
+    send_json_line(c->sock, e, c->cfg.tx_line_max);
+    cJSON_Delete(e);
+    return;
+  }
+
+  bool bad_col = false;
+  char* sql = build_insert_sql(verb, table, columns, &bad_col);
+  // fields are unescaped in place, in a copy owned by us (bound SQLITE_STATIC below)
+  char* buf = sql ? strdup(csv) : NULL;
+  if (!sql || !buf) {
+    free(sql);
+    cJSON* e = bad_col ? make_err(400, "invalid column name") : make_err(500, "no mem");
+    send_json_line(c->sock, e, c->cfg.tx_line_max);
+    cJSON_Delete(e);
+    return;
+  }
+
+  if (xSemaphoreTake(c->db_mutex, pdMS_TO_TICKS(5000)) != pdTRUE) {
+    free(sql);
+    free(buf);
+    cJSON* e = make_err(500, "db mutex timeout");
+    send_json_line(c->sock, e, c->cfg.tx_line_max);
+    cJSON_Delete(e);
+    return;
+  }
+
+  sqlite3_stmt* stmt = NULL;
+  int rc = sqlite3_prepare_v2(c->db, sql, -1, &stmt, NULL);
+  free(sql);
+
+  int err_code = 0;
+  char msg[256];
+  int done_rows = 0;
+  int changes = 0;
+
+  if (rc != SQLITE_OK || !stmt) {
+    err_code = 500;
+    snprintf(msg, sizeof(msg), "sqlite rc=%d: %s", rc, sqlite3_errmsg(c->db));
+  } else {
+    char* p = buf;
+    while (*p) {
+      if (*p == '\n' || *p == '\r') {  // skip empty lines
+        p++;
+        continue;
+      }
+
+      int nfields = 0;
+      bool eol = false;
+      rc = SQLITE_OK;
+      while (!eol) {
+        char* field = csv_next_field(&p, delim, &eol);
+        if (++nfields > ncols) continue;
+        if (rc == SQLITE_OK) rc = sqlite3_bind_text(stmt, nfields, field, -1, SQLITE_STATIC);
+      }
+
+      if (nfields != ncols) {
+        err_code = 400;
+        snprintf(msg, sizeof(msg), "row %d: expected %d fields, got %d", done_rows, ncols, nfields);
+      } else {
+        if (rc == SQLITE_OK) {
+          rc = sqlite3_step(stmt);
+          if (rc == SQLITE_DONE) {
+            rc = SQLITE_OK;
+            changes += sqlite3_changes(c->db);
+          }
+        }
+        if (rc != SQLITE_OK) {
+          err_code = 500;
+          snprintf(msg, sizeof(msg), "row %d: sqlite rc=%d: %s", done_rows, rc, sqlite3_errmsg(c->db));
+        }
+      }
+
+      sqlite3_reset(stmt);
+      sqlite3_clear_bindings(stmt);
+      if (err_code) break;
+      done_rows++;
+    }
+  }
+
+  sqlite3_int64 last_id = sqlite3_last_insert_rowid(c->db);
+  if (stmt) sqlite3_finalize(stmt);
+
+  xSemaphoreGive(c->db_mutex);
+  free(buf);
+
+  cJSON* resp = NULL;
+  if (err_code) {
+    resp = make_err(err_code, msg);
+  } else {
+    resp = make_ok();
+    cJSON_AddNumberToObject(resp, "rows", done_rows);
+    cJSON_AddNumberToObject(resp, "changes", changes);
+    cJSON_AddNumberToObject(resp, "last_insert_rowid", (double)last_id);
+  }
+  send_json_line(c->sock, resp, c->cfg.tx_line_max);
+  cJSON_Delete(resp);
+}
+
 static void handle_ping(client_ctx_t* c) {
   cJSON* resp = make_ok();
   cJSON_AddBoolToObject(resp, "pong", true);
@@ -511,6 +867,10 @@ static void dispatch(client_ctx_t* c, const char* line) {
     handle_reset(c, req);
   } else if (strcmp(op, "finalize") == 0) {
     handle_finalize(c, req);
+  } else if (strcmp(op, "bulk_insert") == 0) {
+    handle_bulk_insert(c, req);
+  } else if (strcmp(op, "import_csv") == 0) {
+    handle_import_csv(c, req);
   } else {
     cJSON* e = make_err(501, "unknown op");
     send_json_line(c->sock, e, c->cfg.tx_line_max);
@@ -626,6 +986,11 @@ static void server_task(void* arg) {
       continue;
     }
 
+    // One response line per send(): with Nagle on, pipelined responses after the first
+    // wait for the client's (delayed) ACK.
+    int nodelay = 1;
+    setsockopt(sock, IPPROTO_TCP, TCP_NODELAY, &nodelay, sizeof(nodelay));
+
     // create per-client context
     client_ctx_t* c = (client_ctx_t*)calloc(1, sizeof(client_ctx_t));
     if (!c) {
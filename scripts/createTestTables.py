@@ -2,8 +2,12 @@
 # createTestTables.py — seed script for sqlite-tcp-v1 (ESP32 SQLite TCP Server)
 # - Creates and seeds: onderwijsniveau, functie, functie_categorie, persoon
 # - persoon has: functie (code), categorie (code), inkomen (integer)
-# - Generates 60 persons, 50 unique last names, top-10 NL cities, education+income with (approx) normal distributions
+# - Generates 60 persons (--count), 50 unique last names, top-10 NL cities, education+income with (approx) normal distributions
 # - No JOINs, no constraints (no FOREIGN KEY), only indexes for speed
+# - persoon rows are sent with the bulk_insert op (--sql-inserts: multi-row INSERT statements instead,
+#   --bulk-csv: written to a CSV file and sent as CSV text with the import_csv op)
+# - Static tables also go through bulk_insert (with --sql-inserts: multi-row INSERT statements,
+#   bounded by the server's request line size)
 # - Lots of log_info() for progress
 #
 # Usage examples:
@@ -12,86 +16,35 @@
 #   ./createTestTables.py --no-drop --no-refresh-personen
 #   ./createTestTables.py --log-level debug
 #   ./createTestTables.py --seed 123
+#   ./createTestTables.py --batch-size 20
+#   ./createTestTables.py --sql-inserts
+#   ./createTestTables.py --bulk-csv /tmp/personen.csv
+#   ./createTestTables.py --connections 2
+#   ./createTestTables.py --fast-pragmas
 
 import argparse
-import json
+import bisect
+import functools
+import math
 import random
 import socket
-import sys
 import time
-from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 from typing import Any, Dict, List, Tuple, Optional
 
-PROTO = "sqlite-tcp-v1"
-
-# ---------------- logging ----------------
-LOG_ERROR = 0
-LOG_INFO = 1
-LOG_DEBUG = 2
-LOG_LEVEL = LOG_INFO
-
-def ts() -> str:
-    return time.strftime("%H:%M:%S")
-
-def log_error(msg: str) -> None:
-    if LOG_LEVEL >= LOG_ERROR:
-        print(f"[{ts()}] ERROR {msg}", file=sys.stderr, flush=True)
-
-def log_info(msg: str) -> None:
-    if LOG_LEVEL >= LOG_INFO:
-        print(f"[{ts()}] INFO  {msg}", file=sys.stderr, flush=True)
-
-def log_debug(msg: str) -> None:
-    if LOG_LEVEL >= LOG_DEBUG:
-        print(f"[{ts()}] DEBUG {msg}", file=sys.stderr, flush=True)
-
-def ms(dt_sec: float) -> int:
-    return int(dt_sec * 1000.0)
-
-def sec3(dt_sec: float) -> str:
-    return f"{dt_sec:.3f}s"
-
-# ---------------- protocol helpers ----------------
-def json_send(sock: socket.socket, obj: Dict[str, Any]) -> None:
-    line = (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
-    log_debug(f"TX {len(line)}b: {line.decode('utf-8', errors='ignore').rstrip()}")
-    sock.sendall(line)
-
-def json_recv_line(f, timeout_sec: float, sock: socket.socket) -> Dict[str, Any]:
-    sock.settimeout(timeout_sec)
-    try:
-        line = f.readline()
-    except socket.timeout:
-        raise TimeoutError(f"Timeout waiting for server response after {timeout_sec}s")
-    finally:
-        sock.settimeout(None)
-
-    if not line:
-        raise ConnectionError("Server closed connection (EOF)")
-
-    txt = line.decode("utf-8", errors="strict").rstrip("\n")
-    log_debug(f"RX {len(line)}b: {txt}")
-    return json.loads(txt)
-
-def expect_ok(resp: Dict[str, Any]) -> Dict[str, Any]:
-    if not resp.get("ok", False):
-        raise RuntimeError(resp.get("error", {}).get("message", f"Server error: {resp}"))
-    return resp
-
-def exec_sql(sock: socket.socket, f, sql: str, timeout: float) -> int:
-    t0 = time.perf_counter()
-    json_send(sock, {"op": "exec", "sql": sql})
-    resp = expect_ok(json_recv_line(f, timeout, sock))
-    _ = resp.get("changes", None)
-    return ms(time.perf_counter() - t0)
-
-def sql_quote(s: str) -> str:
-    return "'" + s.replace("'", "''") + "'"
-
-def insert_sql(prefix: str, table: str, cols: str, values: str) -> str:
-    return f"{prefix} INTO {table} ({cols}) VALUES ({values});"
+from sqlite_tcp_client import (
+    LineReader, bulk_insert, csv_records, debug_enabled, exec_sql, exec_sql_pipelined, expect_ok, handshake,
+    import_csv, insert_sql, json_recv_line, json_send, log_debug, log_error, log_info, ms, open_connection,
+    query_value, sec3, set_log_level, sql_quote,
+)
 
 # ---------------- seed data (static tables) ----------------
+PERSOON_COLS: List[str] = [
+    "voornaam", "achternaam", "geboortedatum", "woonplaats", "opleiding",
+    "functie", "categorie", "ervaring_sinds", "inkomen",
+]
+
 # Education codes: include LO, MA (MAVO), HA (HAVO), GYM, VWO, etc.
 ONDERWIJSNIVEAU: List[Tuple[str, str]] = [
     ("-", "Geen"),
@@ -182,6 +135,34 @@ TYPICAL_CAT: Dict[str, str] = {
     "SPH": "ZRG", "KOK": "HOS", "BED": "HOS", "SCH": "HOS", "BEV": "VEI", "BOA": "VEI",
 }
 
+# Column view of FUNCTIES/FUNCTIE_CATEGORIE codes
+FUNCTIE_CODES: List[str] = [c for c, _ in FUNCTIES]
+CATEGORIE_CODES: List[str] = [c for c, _ in FUNCTIE_CATEGORIE]
+
+# Categorie distribution per functie (persoon categorie mostly follows the functie):
+# - PRJ: 65% uniform over PRJ_DOMAINS, 35% typical
+# - others: 85% typical, 15% uniform over all categories
+PRJ_DOMAINS = ["ICT","ZRG","BOU","FIN","OND","ADM","TEC","LOG"]
+
+def categorie_cum_weights(fnc: str) -> List[float]:
+    typical = TYPICAL_CAT[fnc]
+    if fnc == "PRJ":
+        w = [0.65 / len(PRJ_DOMAINS) if c in PRJ_DOMAINS else 0.0 for c in CATEGORIE_CODES]
+        w[CATEGORIE_CODES.index(typical)] += 0.35
+    else:
+        w = [0.15 / len(CATEGORIE_CODES)] * len(CATEGORIE_CODES)
+        w[CATEGORIE_CODES.index(typical)] += 0.85
+    cum: List[float] = []
+    acc = 0.0
+    for x in w:
+        acc += x
+        cum.append(acc)
+    cum[-1] = 1.0  # no float drift past the last bucket
+    return cum
+
+# indexed by position in FUNCTIES; sample with CATEGORIE_CODES[bisect(cum, random())]
+CAT_CUM_WEIGHTS: List[List[float]] = [categorie_cum_weights(c) for c in FUNCTIE_CODES]
+
 TOP10_CITIES_NL = [
     "Amsterdam", "Rotterdam", "Den Haag", "Utrecht", "Eindhoven",
     "Groningen", "Tilburg", "Almere", "Breda", "Nijmegen"
@@ -199,205 +180,278 @@ LASTNAMES_50 = [
     "de Wit","van 't Hof","van der Plas","van de Ven","van der Steen","de Graaf","van der Horst","Wolters","Koning","van der Krogt"
 ]
 
+# Education score buckets (index 0..10) for choose_education_codes
+EDU_BUCKETS = ["-","LO","BO","LBO","MA","HA","VWO","GYM","MBO","HBO","WO"]
+
+# Rough annual gross income by education (EUR): (mean, std, lo, hi)
+# Sampled from a normal distribution and clamped to the plausible band.
+INCOME_PARAMS: Dict[str, Tuple[int, int, int, int]] = {
+    "-":  (22000, 4000, 16000, 32000),
+    "LO": (23000, 4500, 16000, 34000),
+    "BO": (24000, 4500, 17000, 36000),
+    "LBO":(26000, 5000, 18000, 40000),
+    "MA": (28000, 5500, 20000, 45000),
+    "HA": (30000, 6000, 22000, 50000),
+    "VWO":(32000, 6500, 24000, 56000),
+    "GYM":(33000, 7000, 25000, 60000),
+    "MBO":(34000, 7000, 24000, 60000),
+    "HBO":(42000, 9000, 28000, 80000),
+    "WO": (52000, 12000, 32000, 120000),
+}
+INCOME_DEFAULT = (32000, 7000, 20000, 70000)
+
 # ---------------- generation helpers ----------------
 def clamp_int(x: float, lo: int, hi: int) -> int:
     if x < lo:
         return lo
     if x > hi:
         return hi
-    return int(round(x))
-
-def rand_norm(rng: random.Random, mean: float, std: float) -> float:
-    # Box-Muller transform
-    u1 = max(1e-12, rng.random())
-    u2 = max(1e-12, rng.random())
-    z = ( (-2.0 * (u1).ln()) ** 0.5 )  # will fail: float has no ln
-    return mean + std * z
-
-def rand_norm_box_muller(rng: random.Random, mean: float, std: float) -> float:
-    # Box-Muller, using math without importing heavy libs isn't possible; use math.
-    import math
-    u1 = max(1e-12, rng.random())
-    u2 = max(1e-12, rng.random())
-    z0 = math.sqrt(-2.0 * math.log(u1)) * math.cos(2.0 * math.pi * u2)
-    return mean + std * z0
-
-def choose_education_codes_60(rng: random.Random) -> List[str]:
+    # round half away from zero: int() truncation instead of a round() call
+    return int(x + 0.5) if x >= 0.0 else -int(0.5 - x)
+
+_log = math.log
+_sqrt = math.sqrt
+_cos = math.cos
+_sin = math.sin
+_TWO_PI = 2.0 * math.pi
+
+def std_normals(rng: random.Random, n: int) -> List[float]:
+    # n samples ~ N(0, 1) via Box-Muller; each (u1, u2) pair yields two samples (z0, z1)
+    out: List[float] = []
+    rnd = rng.random
+    while len(out) < n:
+        u1 = max(1e-12, rnd())
+        r = _sqrt(-2.0 * _log(u1))
+        a = _TWO_PI * rnd()
+        out.append(r * _cos(a))
+        out.append(r * _sin(a))
+    del out[n:]
+    return out
+
+def choose_education_codes(rng: random.Random, count: int) -> List[str]:
     # Ensure each education appears at least once
     codes = [c for c, _ in ONDERWIJSNIVEAU]
     # We'll exclude "-" from "normal distribution"; but user asked all opleidingen min 1x,
     # so we keep "-" once as well.
     must = codes[:]  # includes "-"
-    remaining = 60 - len(must)
+    remaining = count - len(must)
     if remaining < 0:
-        # shouldn't happen
-        must = must[:60]
+        # count below number of education levels: coverage check in main() reports it
+        must = must[:count]
         remaining = 0
 
-    # Define an approximate "normal-like" distribution centered around MBO/HBO.
-    # We'll map integer score to codes.
-    # score ~ N(mean=6.5, std=1.8) on 0..10 scale and bucket.
-    buckets = ["-","LO","BO","LBO","MA","HA","VWO","GYM","MBO","HBO","WO"]  # index 0..10
-    out = must[:]
-    for _ in range(remaining):
-        s = rand_norm_box_muller(rng, mean=8.0, std=1.7)  # centered near MBO/HBO
-        idx = clamp_int(s, 0, 10)
-        out.append(buckets[idx])
+    # Approximate "normal-like" distribution centered around MBO/HBO:
+    # score ~ N(mean=8.0, std=1.7) on 0..10 scale, bucketed via EDU_BUCKETS.
+    out = must + [EDU_BUCKETS[clamp_int(8.0 + 1.7 * z, 0, 10)] for z in std_normals(rng, remaining)]
     rng.shuffle(out)
     return out
 
-def income_for_education(rng: random.Random, edu: str) -> int:
-    # Rough annual gross income ranges by education (EUR)
-    # We'll sample from normal distributions and clamp to plausible bands.
-    params = {
-        "-":  (22000, 4000, 16000, 32000),
-        "LO": (23000, 4500, 16000, 34000),
-        "BO": (24000, 4500, 17000, 36000),
-        "LBO":(26000, 5000, 18000, 40000),
-        "MA": (28000, 5500, 20000, 45000),
-        "HA": (30000, 6000, 22000, 50000),
-        "VWO":(32000, 6500, 24000, 56000),
-        "GYM":(33000, 7000, 25000, 60000),
-        "MBO":(34000, 7000, 24000, 60000),
-        "HBO":(42000, 9000, 28000, 80000),
-        "WO": (52000, 12000, 32000, 120000),
-    }
-    mean, std, lo, hi = params.get(edu, (32000, 7000, 20000, 70000))
-    x = rand_norm_box_muller(rng, mean, std)
-    return clamp_int(x, lo, hi)
+def incomes_for_educations(rng: random.Random, educations: List[str]) -> List[int]:
+    # One normal sample per person from the INCOME_PARAMS band of their education
+    out: List[int] = []
+    for edu, z in zip(educations, std_normals(rng, len(educations))):
+        mean, std, lo, hi = INCOME_PARAMS.get(edu, INCOME_DEFAULT)
+        out.append(clamp_int(mean + std * z, lo, hi))
+    return out
 
-def random_birthdate(rng: random.Random) -> str:
-    # Age 20..60
-    today = date.today()
+# Dates are handled as proleptic ordinals (date.toordinal()): plain int arithmetic,
+# converted to an ISO string once per date.
+def random_birth_ord(rng: random.Random, today_ord: int) -> int:
+    # Age 20..60, +/- 180 days jitter
     age_years = rng.randint(20, 60)
-    # +/- 180 days jitter
     jitter_days = rng.randint(-180, 180)
-    d = today - timedelta(days=age_years * 365 + jitter_days)
-    return d.isoformat()
+    return today_ord - (age_years * 365 + jitter_days)
 
-def random_experience_since(rng: random.Random, birth_ymd: str) -> str:
+def random_experience_since_ord(rng: random.Random, today_ord: int, birth_ord: int) -> int:
     # Experience since age 16.. (now), but realistic: between 0 and 25 years
-    today = date.today()
-    b = date.fromisoformat(birth_ymd)
-    earliest = b + timedelta(days=16 * 365)
-    if earliest > today:
-        earliest = today
+    earliest = min(birth_ord + 16 * 365, today_ord)
     # choose a start date between max(earliest, today-25y) and today
-    min_start = today - timedelta(days=25 * 365)
-    if earliest > min_start:
-        min_start = earliest
-    if min_start > today:
-        min_start = today
-    span = (today - min_start).days
-    start = min_start + timedelta(days=rng.randint(0, max(0, span)))
-    return start.isoformat()
-
-def generate_personen_60(rng: random.Random) -> List[Tuple[str,str,str,str,str,str,str,str,int]]:
+    min_start = min(max(today_ord - 25 * 365, earliest), today_ord)
+    return min_start + rng.randint(0, today_ord - min_start)
+
+def generate_personen(rng: random.Random, count: int = 60) -> List[Tuple[str,str,str,str,str,str,str,str,int]]:
     # Output tuple:
     # (voornaam, achternaam, geboortedatum, woonplaats, opleiding_code, functie_code, categorie_code, ervaring_sinds, inkomen)
-    educations = choose_education_codes_60(rng)
-
-    # Need 60 persons, 50 unique last names => pick 50 unique + repeat 10 randomly
-    lastnames = LASTNAMES_50[:]
-    repeats = [rng.choice(LASTNAMES_50) for _ in range(10)]
-    lastnames60 = lastnames + repeats
-    rng.shuffle(lastnames60)
-
-    functie_codes = [c for c, _ in FUNCTIES]
-    categorie_codes = [c for c, _ in FUNCTIE_CATEGORIE]
+    educations = choose_education_codes(rng, count)
+    incomes = incomes_for_educations(rng, educations)
+
+    # 50 unique last names, the rest (count > 50) repeats randomly
+    if count >= len(LASTNAMES_50):
+        lastnames = LASTNAMES_50 + rng.choices(LASTNAMES_50, k=count - len(LASTNAMES_50))
+    else:
+        lastnames = rng.sample(LASTNAMES_50, count)
+    rng.shuffle(lastnames)
+
+    # per-person picks sampled up front (functie as index into FUNCTIES)
+    vns_f = rng.choices(FIRSTNAMES_F, k=count)
+    vns_m = rng.choices(FIRSTNAMES_M, k=count)
+    wps = rng.choices(TOP10_CITIES_NL, k=count)
+    fnc_idxs = rng.choices(range(len(FUNCTIE_CODES)), k=count)
+
+    # hot loop: bind per-call lookups to locals once
+    rnd = rng.random
+    find = bisect.bisect_right
+    today_ord = date.today().toordinal()
+    fromordinal = date.fromordinal
+    functie_codes = FUNCTIE_CODES
+    categorie_codes = CATEGORIE_CODES
+    cat_cum = CAT_CUM_WEIGHTS
 
     personen: List[Tuple[str,str,str,str,str,str,str,str,int]] = []
-    for i in range(60):
-        gender = "F" if rng.random() < 0.5 else "M"
-        vn = rng.choice(FIRSTNAMES_F if gender == "F" else FIRSTNAMES_M)
-        an = lastnames60[i]
-        gb = random_birthdate(rng)
-        wp = rng.choice(TOP10_CITIES_NL)
+    append = personen.append
+    for i in range(count):
+        gender = "F" if rnd() < 0.5 else "M"
+        vn = vns_f[i] if gender == "F" else vns_m[i]
+        an = lastnames[i]
+        gb_ord = random_birth_ord(rng, today_ord)
+        gb = fromordinal(gb_ord).isoformat()
+        wp = wps[i]
         opl = educations[i]
 
-        fnc = rng.choice(functie_codes)
+        fi = fnc_idxs[i]
+        fnc = functie_codes[fi]
 
         # categorie is a property of person; mostly typical, sometimes vary (esp PRJ)
-        typical = TYPICAL_CAT.get(fnc, rng.choice(categorie_codes))
-        if fnc == "PRJ":
-            # allow PRJ in many domains
-            if rng.random() < 0.65:
-                cat = rng.choice(["ICT","ZRG","BOU","FIN","OND","ADM","TEC","LOG"])
-            else:
-                cat = typical
-        else:
-            # 85% typical, 15% random other
-            if rng.random() < 0.85:
-                cat = typical
-            else:
-                cat = rng.choice(categorie_codes)
+        cat = categorie_codes[find(cat_cum[fi], rnd())]
 
-        erv = random_experience_since(rng, gb)
+        erv = fromordinal(random_experience_since_ord(rng, today_ord, gb_ord)).isoformat()
 
-        inc = income_for_education(rng, opl)
+        inc = incomes[i]
 
-        personen.append((vn, an, gb, wp, opl, fnc, cat, erv, inc))
+        append((vn, an, gb, wp, opl, fnc, cat, erv, inc))
     return personen
 
 # ---------------- seeding helpers ----------------
-def run_batch(sock: socket.socket, f, timeout: float, label: str, sql_list: List[str], progress_every: int = 10) -> None:
+def run_batch(sock: socket.socket, f, timeout: float, label: str, sql_list: List[str],
+              progress_every: int = 10, pipeline: int = 32) -> None:
+    # Statements are pipelined in chunks of `pipeline`; a server error only fails its own statement,
+    # transport errors (timeout/EOF) abort the batch since the response stream is out of sync then.
     log_info(f"{label}: starting ({len(sql_list)} statements) ...")
     t0 = time.perf_counter()
     t_chunk0 = time.perf_counter()
     ok = 0
-    for i, sql in enumerate(sql_list, start=1):
-        try:
-            dt_ms = exec_sql(sock, f, sql, timeout)
-            ok += 1
-            log_debug(f"{label} item#{i} dt={dt_ms}ms")
-        except Exception as e:
-            # keep going but report
-            log_error(f"{label} item#{i} failed: {type(e).__name__}: {e}")
-        if progress_every > 0 and (i % progress_every == 0):
-            chunk = time.perf_counter() - t_chunk0
-            log_info(f"{label}: processed {i}/{len(sql_list)} in {sec3(chunk)}")
+    step = max(1, pipeline)
+    debug = debug_enabled()  # checked per item below
+    for c0 in range(0, len(sql_list), step):
+        chunk = sql_list[c0:c0 + step]
+        t_pipe0 = time.perf_counter()
+        errors = exec_sql_pipelined(sock, f, chunk, timeout)
+        dt_ms = ms(time.perf_counter() - t_pipe0)
+        for i, err in enumerate(errors, start=c0 + 1):
+            if err is None:
+                ok += 1
+                if debug:
+                    log_debug(f"{label} item#{i} ok (chunk dt={dt_ms}ms)")
+            else:
+                # keep going but report
+                log_error(f"{label} item#{i} failed: {err}")
+        done = c0 + len(chunk)
+        if progress_every > 0 and (done // progress_every) > (c0 // progress_every):
+            dt_chunk = time.perf_counter() - t_chunk0
+            log_info(f"{label}: processed {done}/{len(sql_list)} in {sec3(dt_chunk)}")
             t_chunk0 = time.perf_counter()
     total = time.perf_counter() - t0
     log_info(f"{label}: done ok={ok}/{len(sql_list)} in {sec3(total)}")
 
+def run_bulk(sock: socket.socket, f, timeout: float, label: str, table: str, columns: List[str],
+             rows: List[Any], conflict: Optional[str] = None, op: str = "bulk_insert") -> None:
+    # rows: value tuples for bulk_insert, CSV records for import_csv
+    log_info(f"{label}: starting ({len(rows)} rows, {op}) ...")
+    t0 = time.perf_counter()
+    send = import_csv if op == "import_csv" else bulk_insert
+    n_req, changes = send(sock, f, table, columns, rows, timeout, conflict=conflict)
+    log_info(f"{label}: done rows={len(rows)} changes={changes} requests={n_req} in {sec3(time.perf_counter()-t0)}")
+
+# Pre-quoted SQL literals for all constant strings a persoon row can contain
+_QUOTED: Dict[str, str] = {
+    v: sql_quote(v)
+    for v in (TOP10_CITIES_NL + FIRSTNAMES_M + FIRSTNAMES_F + LASTNAMES_50
+              + [c for c, _ in ONDERWIJSNIVEAU] + [c for c, _ in FUNCTIES] + [c for c, _ in FUNCTIE_CATEGORIE])
+}
+
+def persoon_values(p: Tuple[str,str,str,str,str,str,str,str,int]) -> str:
+    vn, an, gb, wp, opl, fnc, cat, erv, inc = p
+    q = _QUOTED.get
+    return ",".join([
+        q(vn) or sql_quote(vn), q(an) or sql_quote(an), sql_quote(gb), q(wp) or sql_quote(wp),
+        q(opl) or sql_quote(opl), q(fnc) or sql_quote(fnc), q(cat) or sql_quote(cat), sql_quote(erv), str(int(inc)),
+    ])
+
+# Built after the persoon seed: one sort per index instead of an index update per inserted row
+PERSOON_INDEXES: List[str] = [
+    "CREATE INDEX IF NOT EXISTS idx_persoon_achternaam ON persoon(achternaam);",
+    "CREATE INDEX IF NOT EXISTS idx_persoon_woonplaats ON persoon(woonplaats);",
+    "CREATE INDEX IF NOT EXISTS idx_persoon_functie ON persoon(functie);",
+    "CREATE INDEX IF NOT EXISTS idx_persoon_categorie ON persoon(categorie);",
+]
+
+STATIC_TABLES: Dict[str, List[Tuple[str, str]]] = {
+    "onderwijsniveau": ONDERWIJSNIVEAU,
+    "functie_categorie": FUNCTIE_CATEGORIE,
+    "functie": FUNCTIES,
+}
+
+STATIC_COLS: List[str] = ["code", "omschrijving"]
+
+INSERT_PREFIXES = ("INSERT", "INSERT OR IGNORE", "INSERT OR REPLACE")
+
+def static_sql_lists(insert_prefix: str) -> Dict[str, List[str]]:
+    # Static tables go in as few statements as possible
+    return {
+        table: insert_sql(insert_prefix, table, ",".join(STATIC_COLS),
+                          [f"{sql_quote(code)},{sql_quote(oms)}" for code, oms in rows])
+        for table, rows in STATIC_TABLES.items()
+    }
+
+# Static table SQL only depends on the insert prefix: build once at import
+_STATIC_SQL: Dict[str, Dict[str, List[str]]] = {p: static_sql_lists(p) for p in INSERT_PREFIXES}
+
+def split_even(items: List[Any], parts: int) -> List[List[Any]]:
+    # contiguous slices, sizes differ by at most 1, no empty slices
+    parts = max(1, min(parts, len(items)))
+    k, r = divmod(len(items), parts)
+    out: List[List[Any]] = []
+    i = 0
+    for p in range(parts):
+        n = k + (1 if p < r else 0)
+        out.append(items[i:i + n])
+        i += n
+    return out
+
+def run_parallel(host: str, port: int, timeout: float, jobs: List[Any], connections: int) -> None:
+    # Run job(sock, f) callables on `connections` extra connections in parallel.
+    # All clients of the ESP32 server share one sqlite handle, so a BEGIN issued on the
+    # main connection also covers these inserts; the gain is overlapping network RTTs.
+    def work(job: Any) -> None:
+        with open_connection(host, port, connect_timeout=5) as sock:
+            sock.settimeout(timeout)
+            f = LineReader(sock)
+            handshake(sock, f, timeout)
+            job(sock, f)
+
+    with ThreadPoolExecutor(max_workers=connections) as ex:
+        futures = [ex.submit(work, job) for job in jobs]
+        for fut in futures:
+            fut.result()  # re-raises the first failure
+
 def make_sql_lists(insert_prefix: str,
-                   personen: List[Tuple[str,str,str,str,str,str,str,str,int]]) -> Dict[str, List[str]]:
-    sqls: Dict[str, List[str]] = {}
-
-    sqls["onderwijsniveau"] = [
-        insert_sql(insert_prefix, "onderwijsniveau", "code,omschrijving",
-                   f"{sql_quote(code)},{sql_quote(oms)}")
-        for code, oms in ONDERWIJSNIVEAU
-    ]
-
-    sqls["functie_categorie"] = [
-        insert_sql(insert_prefix, "functie_categorie", "code,omschrijving",
-                   f"{sql_quote(code)},{sql_quote(oms)}")
-        for code, oms in FUNCTIE_CATEGORIE
-    ]
-
-    sqls["functie"] = [
-        insert_sql(insert_prefix, "functie", "code,omschrijving",
-                   f"{sql_quote(code)},{sql_quote(oms)}")
-        for code, oms in FUNCTIES
-    ]
-
-    sqls["persoon"] = [
-        insert_sql(
-            insert_prefix,
-            "persoon",
-            "voornaam,achternaam,geboortedatum,woonplaats,opleiding,functie,categorie,ervaring_sinds,inkomen",
-            f"{sql_quote(vn)},{sql_quote(an)},{sql_quote(gb)},{sql_quote(wp)},"
-            f"{sql_quote(opl)},{sql_quote(fnc)},{sql_quote(cat)},{sql_quote(erv)},{int(inc)}",
-        )
-        for (vn, an, gb, wp, opl, fnc, cat, erv, inc) in personen
-    ]
+                   personen: List[Tuple[str,str,str,str,str,str,str,str,int]],
+                   batch_size: int = 50) -> Dict[str, List[str]]:
+    # Static tables from _STATIC_SQL, persoon in chunks of batch_size rows
+    static = _STATIC_SQL.get(insert_prefix) or static_sql_lists(insert_prefix)
+    sqls: Dict[str, List[str]] = {table: list(sql_list) for table, sql_list in static.items()}
+
+    sqls["persoon"] = insert_sql(
+        insert_prefix,
+        "persoon",
+        ",".join(PERSOON_COLS),
+        [persoon_values(p) for p in personen],
+        batch_size=batch_size,
+    )
 
     return sqls
 
 def main() -> int:
-    global LOG_LEVEL
-
     ap = argparse.ArgumentParser(description="Create/seed ESP32 sqlite-tcp-v1 tables (flat model, no constraints).")
     ap.add_argument("--host", default="192.168.12.14", help="Server IP/hostname")
     ap.add_argument("--port", type=int, default=5555, help="Server port")
@@ -407,21 +461,35 @@ def main() -> int:
     ap.add_argument("--no-refresh-personen", action="store_true", help="When --no-drop: do NOT delete persoon before insert")
     ap.add_argument("--upsert", action="store_true", help="When --no-drop: use INSERT OR REPLACE (otherwise INSERT OR IGNORE)")
     ap.add_argument("--seed", type=int, default=42, help="Random seed for person generation (default: 42)")
+    ap.add_argument("--count", type=int, default=60, help="Number of persons to generate (default: 60)")
+    ap.add_argument("--batch-size", type=int, default=50, help="Max persoon rows per INSERT statement (default: 50)")
+    seed_mode = ap.add_mutually_exclusive_group()
+    seed_mode.add_argument("--sql-inserts", action="store_true", help="Seed with INSERT statements instead of the bulk_insert op")
+    seed_mode.add_argument("--bulk-csv", nargs="?", const="personen.csv", default=None, metavar="PATH",
+                    help="Write persoon rows to a CSV file (default: personen.csv) and seed them with the import_csv op")
+    ap.add_argument("--fast-pragmas", action="store_true",
+                    help="Seed with PRAGMA synchronous=OFF and journal_mode=MEMORY (restored afterwards; not crash safe)")
+    ap.add_argument("--connections", type=int, default=1, help="Parallel seed connections (default: 1, server must allow that many clients)")
+    ap.add_argument("--pipeline", type=int, default=32, help="Statements sent before reading responses (default: 32)")
     args = ap.parse_args()
+    # every onderwijsniveau gets at least one person (coverage check below)
+    if args.count < len(ONDERWIJSNIVEAU):
+        ap.error(f"--count must be at least {len(ONDERWIJSNIVEAU)} (one person per onderwijsniveau)")
 
-    LOG_LEVEL = {"error":LOG_ERROR, "info":LOG_INFO, "debug":LOG_DEBUG}[args.log_level]
+    set_log_level(args.log_level)
 
     rng = random.Random(args.seed)
 
     insert_prefix = "INSERT" if not args.no_drop else ("INSERT OR REPLACE" if args.upsert else "INSERT OR IGNORE")
+    conflict = None if not args.no_drop else ("replace" if args.upsert else "ignore")
 
     log_info(f"Config: host={args.host} port={args.port} timeout={args.timeout}s log={args.log_level} seed={args.seed}")
     log_info(f"Insert mode: {insert_prefix}")
 
     # generate persons now (so we can log distribution)
-    log_info("Generating 60 persons (50 unique last names, top-10 NL cities, education+income ~ normal) ...")
+    log_info(f"Generating {args.count} persons (50 unique last names, top-10 NL cities, education+income ~ normal) ...")
     t_gen0 = time.perf_counter()
-    personen = generate_personen_60(rng)
+    personen = generate_personen(rng, args.count)
     log_info(f"Generated persons in {sec3(time.perf_counter()-t_gen0)}")
 
     # sanity: education coverage
@@ -435,18 +503,26 @@ def main() -> int:
     log_info("Education coverage OK (all education levels appear at least once).")
     log_info("Education counts: " + ", ".join([f"{k}={edu_counts[k]}" for k in sorted(edu_counts.keys())]))
 
+    csv_rows: List[str] = []
+    if args.bulk_csv and not args.sql_inserts:
+        t_csv0 = time.perf_counter()
+        csv_rows = csv_records(personen)
+        # header + records: loadable with the sqlite3 shell (.import --csv --skip 1 personen.csv persoon)
+        with open(args.bulk_csv, "w", encoding="utf-8", newline="") as fh:
+            fh.write(",".join(PERSOON_COLS) + "\n")
+            fh.writelines(csv_rows)
+        log_info(f"Wrote {len(csv_rows)} persons to {args.bulk_csv} in {sec3(time.perf_counter()-t_csv0)}")
+
     log_info(f"Connecting to {args.host}:{args.port} ...")
     t_conn0 = time.perf_counter()
 
     try:
-        with socket.create_connection((args.host, args.port), timeout=5) as sock:
-            f = sock.makefile("rb")
+        with open_connection(args.host, args.port, connect_timeout=5) as sock:
+            sock.settimeout(args.timeout)
+            f = LineReader(sock)
 
             log_info("Waiting for handshake ...")
-            hello = expect_ok(json_recv_line(f, args.timeout, sock))
-            if hello.get("hello") != PROTO:
-                log_error(f"Unexpected protocol. Expected {PROTO}, got {hello.get('hello')}")
-                return 1
+            handshake(sock, f, args.timeout)
             log_info(f"Handshake OK in {sec3(time.perf_counter()-t_conn0)}")
 
             t_ping0 = time.perf_counter()
@@ -485,18 +561,17 @@ def main() -> int:
             log_info("--> Creating persoon table ...")  
             # persoon: categorie is per person; functie is per person; inkomen added
             exec_sql(sock, f, "CREATE TABLE IF NOT EXISTS persoon (id INTEGER PRIMARY KEY, voornaam TEXT NOT NULL, achternaam TEXT NOT NULL, geboortedatum TEXT NOT NULL, woonplaats TEXT NOT NULL, opleiding TEXT NOT NULL, functie TEXT NOT NULL, categorie TEXT NOT NULL, ervaring_sinds TEXT NOT NULL, inkomen INTEGER NOT NULL);", args.timeout * 2)
-            exec_sql(sock, f, "CREATE INDEX IF NOT EXISTS idx_persoon_achternaam ON persoon(achternaam);", args.timeout * 2)
-            exec_sql(sock, f, "CREATE INDEX IF NOT EXISTS idx_persoon_woonplaats ON persoon(woonplaats);", args.timeout * 2)
-            exec_sql(sock, f, "CREATE INDEX IF NOT EXISTS idx_persoon_functie ON persoon(functie);", args.timeout * 2)
-            exec_sql(sock, f, "CREATE INDEX IF NOT EXISTS idx_persoon_categorie ON persoon(categorie);", args.timeout * 2)
+            # persoon indexes are created after the seed (see below), not maintained row by row
 
             log_info(f"Create done in {sec3(time.perf_counter()-t_create0)}")
 
-            # Make SQL lists
-            log_info("Building SQL statement lists ...")
-            t_build0 = time.perf_counter()
-            sql_lists = make_sql_lists(insert_prefix, personen)
-            log_info(f"SQL lists built in {sec3(time.perf_counter()-t_build0)}")
+            # Make SQL lists (only --sql-inserts sends SQL text, the bulk ops bind values server-side)
+            sql_lists: Dict[str, List[str]] = {}
+            if args.sql_inserts:
+                log_info("Building SQL statement lists ...")
+                t_build0 = time.perf_counter()
+                sql_lists = make_sql_lists(insert_prefix, personen, batch_size=args.batch_size)
+                log_info(f"SQL lists built in {sec3(time.perf_counter()-t_build0)}")
 
             # Refresh persons when no-drop (avoid duplicates)
             if args.no_drop and not args.no_refresh_personen:
@@ -507,12 +582,76 @@ def main() -> int:
             elif args.no_drop and args.no_refresh_personen:
                 log_info("Not refreshing persoon (--no-refresh-personen). Duplicates may occur if you INSERT again.")
 
-            # Seed in logical order
+            # Seed in logical order, all in one transaction (one commit/fsync on the server)
             log_info("Seeding tables ...")
-            run_batch(sock, f, args.timeout, "Seed onderwijsniveau", sql_lists["onderwijsniveau"], progress_every=10)
-            run_batch(sock, f, args.timeout, "Seed functie_categorie", sql_lists["functie_categorie"], progress_every=10)
-            run_batch(sock, f, args.timeout, "Seed functie", sql_lists["functie"], progress_every=10)
-            run_batch(sock, f, args.timeout, "Seed persoon", sql_lists["persoon"], progress_every=10)
+            t_seed0 = time.perf_counter()
+            n_conn = max(1, args.connections)
+            if args.sql_inserts:
+                jobs = [
+                    functools.partial(run_batch, timeout=args.timeout, label=f"Seed {table}", sql_list=sql_lists[table],
+                                      progress_every=10, pipeline=args.pipeline)
+                    for table in STATIC_TABLES
+                ]
+            else:
+                jobs = [
+                    functools.partial(run_bulk, timeout=args.timeout, label=f"Seed {table}", table=table,
+                                      columns=STATIC_COLS, rows=rows, conflict=conflict)
+                    for table, rows in STATIC_TABLES.items()
+                ]
+            # persoon (the big one) is split over the connections
+            if args.sql_inserts:
+                parts = split_even(sql_lists["persoon"], n_conn)
+                for i, part in enumerate(parts, start=1):
+                    label = "Seed persoon" if len(parts) == 1 else f"Seed persoon[{i}]"
+                    jobs.append(functools.partial(run_batch, timeout=args.timeout, label=label, sql_list=part,
+                                                  progress_every=10, pipeline=args.pipeline))
+            else:
+                op = "import_csv" if csv_rows else "bulk_insert"
+                parts = split_even(csv_rows or personen, n_conn)
+                for i, part in enumerate(parts, start=1):
+                    label = "Seed persoon" if len(parts) == 1 else f"Seed persoon[{i}]"
+                    jobs.append(functools.partial(run_bulk, timeout=args.timeout, label=label, table="persoon",
+                                                  columns=PERSOON_COLS, rows=part, conflict=conflict, op=op))
+
+            # durability work off for the bulk load; the server shares one db handle, so always put it back
+            saved_pragmas: List[Tuple[str, str]] = []
+            if args.fast_pragmas:
+                for name, fast in (("synchronous", "OFF"), ("journal_mode", "MEMORY")):
+                    old = query_value(sock, f, f"PRAGMA {name};", args.timeout)
+                    if old is not None:
+                        saved_pragmas.append((name, old))
+                    exec_sql(sock, f, f"PRAGMA {name}={fast};", args.timeout)
+                log_info("Fast pragmas on: " + ", ".join(f"{n} (was {v})" for n, v in saved_pragmas))
+
+            # IMMEDIATE: take the write lock now instead of on the first INSERT
+            exec_sql(sock, f, "BEGIN IMMEDIATE;", args.timeout)
+            try:
+                if n_conn > 1:
+                    run_parallel(args.host, args.port, args.timeout, jobs, n_conn)
+                else:
+                    for job in jobs:
+                        job(sock, f)
+                log_info("Creating persoon indexes ...")
+                t_idx0 = time.perf_counter()
+                for err in exec_sql_pipelined(sock, f, PERSOON_INDEXES, args.timeout * 2):
+                    if err is not None:
+                        raise RuntimeError(err)
+                log_info(f"Indexes done in {sec3(time.perf_counter()-t_idx0)}")
+                exec_sql(sock, f, "COMMIT;", args.timeout * 2)
+            except Exception:
+                log_error("Seeding failed, rolling back ...")
+                try:
+                    exec_sql(sock, f, "ROLLBACK;", args.timeout)
+                except Exception as e:
+                    log_error(f"ROLLBACK failed: {type(e).__name__}: {e}")
+                raise
+            finally:
+                for name, old in saved_pragmas:
+                    try:
+                        exec_sql(sock, f, f"PRAGMA {name}={old};", args.timeout)
+                    except Exception as e:
+                        log_error(f"Restoring PRAGMA {name}={old} failed: {type(e).__name__}: {e}")
+            log_info(f"Seed committed in {sec3(time.perf_counter()-t_seed0)}")
 
             log_info("All done.")
             return 0
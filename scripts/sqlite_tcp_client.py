@@ -0,0 +1,478 @@
+# sqlite_tcp_client.py — client side of sqlite-tcp-v1 (ESP32 SQLite TCP Server), shared by the scripts
+# - Logging (stderr), JSON encode/decode (orjson when installed), buffered send/receive
+# - exec/prepare/step/finalize helpers, request pipelining, bulk_insert/import_csv request builders
+# - Every request line must fit the server's rx_line_max (RX_LINE_MAX, see fits_line)
+#
+# Usage:
+#   from sqlite_tcp_client import open_connection, LineReader, handshake, exec_sql
+#   with open_connection(host, port) as sock:
+#       f = LineReader(sock)
+#       handshake(sock, f, timeout)
+#       exec_sql(sock, f, "CREATE TABLE ...", timeout)
+
+import atexit
+import csv
+import io
+import json
+import socket
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Tuple, Optional
+
+try:
+    import orjson  # optional: faster JSON encode/decode, stdlib json otherwise
+except ImportError:
+    orjson = None
+
+PROTO = "sqlite-tcp-v1"
+
+# Must match tcp_sqlite_server_cfg_t.rx_line_max on the ESP32 (see src/main/main.c)
+RX_LINE_MAX = 2048
+
+def fits_line(nbytes: int) -> bool:
+    # recv_line() on the server stores at most rx_line_max - 1 bytes, the "\n" included:
+    # a longer line is cut, and its tail is read as the next (broken) request
+    return nbytes <= RX_LINE_MAX - 1
+
+# ---------------- logging ----------------
+LOG_ERROR = 0
+LOG_INFO = 1
+LOG_DEBUG = 2
+LOG_LEVEL = LOG_INFO
+
+def ts() -> str:
+    return time.strftime("%H:%M:%S")
+
+# Log lines go to the binary stderr in whole lines. Debug lines are collected and written per
+# ~8 KiB (one write+flush instead of one per line); error/info lines flush that buffer first and
+# are written at once, so progress stays live and the order of lines is kept.
+_STDERR = getattr(sys.stderr, "buffer", None)
+_STDERR_ENC = getattr(sys.stderr, "encoding", None) or "utf-8"
+_LOG_BUF = bytearray()
+_LOG_LOCK = threading.Lock()  # parallel seed connections log from worker threads
+LOG_FLUSH_BYTES = 8192
+
+def _write(data: bytes) -> None:
+    if _STDERR is not None:
+        _STDERR.write(data)
+        _STDERR.flush()
+    else:  # stderr replaced by a text-only stream
+        sys.stderr.write(data.decode(_STDERR_ENC, errors="replace"))
+        sys.stderr.flush()
+
+def log_flush() -> None:
+    with _LOG_LOCK:
+        if _LOG_BUF:
+            _write(bytes(_LOG_BUF))
+            _LOG_BUF.clear()
+
+atexit.register(log_flush)
+
+def _emit(line: str, buffered: bool = False) -> None:
+    data = (line + "\n").encode(_STDERR_ENC, errors="replace")
+    with _LOG_LOCK:
+        _LOG_BUF.extend(data)
+        if not buffered or len(_LOG_BUF) >= LOG_FLUSH_BYTES:
+            _write(bytes(_LOG_BUF))
+            _LOG_BUF.clear()
+
+def log_error(msg: str) -> None:
+    if LOG_LEVEL >= LOG_ERROR:
+        _emit(f"[{ts()}] ERROR {msg}")
+
+def log_info(msg: str) -> None:
+    if LOG_LEVEL >= LOG_INFO:
+        _emit(f"[{ts()}] INFO  {msg}")
+
+def log_debug(msg: str) -> None:
+    if LOG_LEVEL >= LOG_DEBUG:
+        _emit(f"[{ts()}] DEBUG {msg}", buffered=True)
+
+LOG_LEVELS = {"error": LOG_ERROR, "info": LOG_INFO, "debug": LOG_DEBUG}
+
+def set_log_level(name: str) -> None:
+    global LOG_LEVEL
+    LOG_LEVEL = LOG_LEVELS[name]
+
+def debug_enabled() -> bool:
+    # for callers that check once before a loop instead of per log_debug() call
+    return LOG_LEVEL >= LOG_DEBUG
+
+def jshort(obj: Any, limit: int = 260) -> str:
+    s = json.dumps(obj, ensure_ascii=False)
+    return s if len(s) <= limit else (s[:limit] + "...")
+
+def ms(dt_sec: float) -> int:
+    return int(dt_sec * 1000.0)
+
+def sec3(dt_sec: float) -> str:
+    return f"{dt_sec:.3f}s"
+
+# ---------------- protocol helpers ----------------
+# Compact UTF-8 JSON either way, so request sizes are the same with or without orjson
+if orjson is not None:
+    def json_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    json_loads = orjson.loads
+else:
+    def json_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    json_loads = json.loads
+
+def json_line(obj: Dict[str, Any]) -> bytes:
+    return json_bytes(obj) + b"\n"
+
+def json_send(sock: socket.socket, obj: Dict[str, Any]) -> None:
+    line = json_line(obj)
+    if LOG_LEVEL >= LOG_DEBUG:  # skip the decode unless it is printed
+        log_debug(f"TX {len(line)}b: {line.decode('utf-8', errors='ignore').rstrip()}")
+    sock.sendall(line)
+
+def json_send_many(sock: socket.socket, objs: List[Dict[str, Any]]) -> None:
+    # Several requests in one sendall; the server answers them in order
+    lines = [json_line(o) for o in objs]
+    for line in lines:
+        if LOG_LEVEL >= LOG_DEBUG:
+            log_debug(f"TX {len(line)}b: {line.decode('utf-8', errors='ignore').rstrip()}")
+    sock.sendall(b"".join(lines))
+
+class BufferedJsonSender:
+    # Collects JSON lines in one bytearray; flush() writes them with a single sendall
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self.buf = bytearray()
+        self.count = 0
+
+    def send(self, obj: Dict[str, Any]) -> None:
+        self.send_line(json_line(obj))
+
+    def send_line(self, line: bytes) -> None:
+        if LOG_LEVEL >= LOG_DEBUG:
+            log_debug(f"TX {len(line)}b: {line.decode('utf-8', errors='ignore').rstrip()}")
+        self.buf += line
+        self.count += 1
+
+    def flush(self) -> int:
+        # returns number of requests written
+        n = self.count
+        if self.buf:
+            self.sock.sendall(self.buf)
+            self.buf.clear()
+        self.count = 0
+        return n
+
+class LineReader:
+    # Buffered line reader on the socket: recv_into() fills one preallocated buffer that serves
+    # many response lines, readline() just slices the next b"...\n" out of it. No per-recv chunk
+    # allocation and no append copy; the unread tail is moved to the front only when it runs out.
+    __slots__ = ("sock", "buf", "view", "pos", "end")
+
+    def __init__(self, sock: socket.socket, bufsize: int = 65536) -> None:
+        self.sock = sock
+        self.buf = bytearray(bufsize)
+        self.view = memoryview(self.buf)
+        self.pos = 0
+        self.end = 0
+
+    def readline(self) -> bytes:
+        buf = self.buf
+        start = self.pos
+        while True:
+            i = buf.find(b"\n", start, self.end)
+            if i >= 0:
+                line = bytes(self.view[self.pos:i + 1])
+                self.pos = i + 1
+                return line
+            # no complete line: move the partial one to the front, grow only for over-long lines
+            n = self.end - self.pos
+            if self.pos:
+                self.view[:n] = self.view[self.pos:self.end]
+                self.pos = 0
+                self.end = n
+            if n == len(buf):
+                self.view.release()
+                buf.extend(bytes(len(buf)))
+                self.view = memoryview(buf)
+            start = n
+            got = self.sock.recv_into(self.view[n:])
+            if not got:
+                # EOF: hand out what is left (b"" when nothing)
+                line = bytes(self.view[:n])
+                self.end = 0
+                return line
+            self.end = n + got
+
+def open_connection(host: str, port: int, connect_timeout: float = 5.0) -> socket.socket:
+    # Like socket.create_connection(), but socket options are set before connect():
+    # buffer sizes only influence the TCP window (scaling) when set before the handshake.
+    # - TCP_NODELAY: a flushed burst of requests goes out at once, no Nagle wait on the tail
+    # - SO_SNDBUF/SO_RCVBUF 256 KiB: lets the client kernel queue whole pipelined batches;
+    #   the ESP32 side keeps its own (small) lwIP window, this only helps the host side
+    # - SO_KEEPALIVE: detect a rebooted/vanished ESP32 on long-lived connections
+    last_err: Optional[OSError] = None
+    for family, socktype, proto, _, addr in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM):
+        sock = socket.socket(family, socktype, proto)
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 262144)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 262144)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            sock.settimeout(connect_timeout)
+            sock.connect(addr)
+            return sock
+        except OSError as e:
+            last_err = e
+            sock.close()
+    raise last_err if last_err else OSError(f"Cannot resolve {host}:{port}")
+
+def handshake(sock: socket.socket, f, timeout: float) -> None:
+    hello = expect_ok(json_recv_line(f, timeout, sock))
+    if hello.get("hello") != PROTO:
+        raise RuntimeError(f"Unexpected protocol. Expected {PROTO}, got {hello.get('hello')}")
+
+def json_recv_line(f, timeout_sec: float, sock: socket.socket) -> Dict[str, Any]:
+    # The socket keeps its timeout between calls; only touch it when a caller needs another value
+    if sock.gettimeout() != timeout_sec:
+        sock.settimeout(timeout_sec)
+    try:
+        line = f.readline()
+    except socket.timeout:
+        raise TimeoutError(f"Timeout waiting for server response after {timeout_sec}s")
+
+    if not line:
+        raise ConnectionError("Server closed connection (EOF)")
+
+    if LOG_LEVEL >= LOG_DEBUG:
+        log_debug(f"RX {len(line)}b: {line.decode('utf-8', errors='ignore').rstrip()}")
+    return json_loads(line)
+
+def expect_ok(resp: Dict[str, Any]) -> Dict[str, Any]:
+    if not resp.get("ok", False):
+        raise RuntimeError(resp.get("error", {}).get("message", f"Server error: {resp}"))
+    return resp
+
+def exec_sql(sock: socket.socket, f, sql: str, timeout: float) -> int:
+    t0 = time.perf_counter()
+    json_send(sock, {"op": "exec", "sql": sql})
+    resp = expect_ok(json_recv_line(f, timeout, sock))
+    _ = resp.get("changes", None)
+    return ms(time.perf_counter() - t0)
+
+def query_value(sock: socket.socket, f, sql: str, timeout: float) -> Any:
+    # First column of the first row (None when there is no row), via prepare/step/finalize
+    json_send(sock, {"op": "prepare", "sql": sql})
+    stmt = expect_ok(json_recv_line(f, timeout, sock))["stmt"]
+    tx = BufferedJsonSender(sock)
+    tx.send({"op": "step", "stmt": stmt})
+    tx.send({"op": "finalize", "stmt": stmt})
+    tx.flush()
+    # read both pipelined responses before checking either, so an error leaves nothing unread
+    step = json_recv_line(f, timeout, sock)
+    fin = json_recv_line(f, timeout, sock)
+    expect_ok(step)
+    expect_ok(fin)
+    row = step.get("row")
+    return None if not row else row[0]
+
+def exec_sql_pipelined(sock: socket.socket, f, sql_list: List[str], timeout: float) -> List[Optional[str]]:
+    # Send all exec requests with one sendall, then drain the responses (server answers in order).
+    # Returns per statement: None when ok, otherwise the server error message.
+    tx = BufferedJsonSender(sock)
+    for sql in sql_list:
+        tx.send({"op": "exec", "sql": sql})
+    n = tx.flush()
+
+    # every response (make_ok/make_err on the server) carries "ok": index it directly in the hot loops
+    errors: List[Optional[str]] = []
+    for _ in range(n):
+        resp = json_recv_line(f, timeout, sock)
+        if resp["ok"]:
+            errors.append(None)
+        else:
+            errors.append(resp.get("error", {}).get("message", f"Server error: {resp}"))
+    return errors
+
+def bulk_insert_lines(table: str, columns: List[str], rows: List[Tuple[Any, ...]],
+                      conflict: Optional[str] = None) -> List[bytes]:
+    # Split rows over as many bulk_insert requests as needed to stay within the line limit (fits_line)
+    req: Dict[str, Any] = {"op": "bulk_insert", "table": table, "columns": columns, "rows": []}
+    if conflict:
+        req["conflict"] = conflict
+    base_len = len(json_line(req))
+    lines: List[bytes] = []
+    chunk: List[Tuple[Any, ...]] = []
+    chunk_len = base_len
+    for row in rows:
+        row_len = len(json_bytes(list(row)))
+        if chunk and not fits_line(chunk_len + 1 + row_len):  # "," + row
+            lines.append(json_line(dict(req, rows=chunk)))
+            chunk = []
+            chunk_len = base_len
+        if chunk:
+            chunk_len += 1  # ","
+        chunk.append(row)
+        chunk_len += row_len
+    if chunk:
+        lines.append(json_line(dict(req, rows=chunk)))
+    return lines
+
+def csv_records(rows: List[Tuple[Any, ...]], delim: str = ",") -> List[str]:
+    # One CSV record (with its "\n") per row; quoting as the sqlite3 shell's .import expects
+    buf = io.StringIO()
+    w = csv.writer(buf, delimiter=delim, lineterminator="\n")
+    records: List[str] = []
+    for row in rows:
+        w.writerow(row)
+        records.append(buf.getvalue())
+        buf.seek(0)
+        buf.truncate()
+    return records
+
+def import_csv_lines(table: str, columns: List[str], records: List[str], delim: str = ",",
+                     conflict: Optional[str] = None) -> List[bytes]:
+    # Like bulk_insert_lines, but rows travel as CSV text in one JSON string (no per-value JSON quoting)
+    req: Dict[str, Any] = {"op": "import_csv", "table": table, "columns": columns, "csv": ""}
+    if delim != ",":
+        req["delim"] = delim
+    if conflict:
+        req["conflict"] = conflict
+    base_len = len(json_line(req))
+    lines: List[bytes] = []
+    chunk: List[str] = []
+    chunk_len = base_len
+    for rec in records:
+        rec_len = len(json_bytes(rec)) - 2  # escaped, without the quotes
+        if chunk and not fits_line(chunk_len + rec_len):
+            lines.append(json_line(dict(req, csv="".join(chunk))))
+            chunk = []
+            chunk_len = base_len
+        chunk.append(rec)
+        chunk_len += rec_len
+    if chunk:
+        lines.append(json_line(dict(req, csv="".join(chunk))))
+    return lines
+
+def send_counted(sock: socket.socket, f, lines: List[bytes], timeout: float) -> Tuple[int, int]:
+    # Pipeline ready-made request lines, sum "changes"; returns (requests, changes), raises on the first server error
+    tx = BufferedJsonSender(sock)
+    for line in lines:
+        tx.send_line(line)
+    n = tx.flush()
+
+    changes = 0
+    error: Optional[str] = None
+    for _ in range(n):
+        resp = json_recv_line(f, timeout, sock)
+        if resp["ok"]:
+            changes += resp["changes"]
+        elif error is None:
+            error = resp.get("error", {}).get("message", f"Server error: {resp}")
+    if error is not None:
+        raise RuntimeError(error)
+    return n, changes
+
+def bulk_insert(sock: socket.socket, f, table: str, columns: List[str], rows: List[Tuple[Any, ...]],
+                timeout: float, conflict: Optional[str] = None) -> Tuple[int, int]:
+    # Server-side prepared INSERT with bind/step/reset per row (op bulk_insert)
+    return send_counted(sock, f, bulk_insert_lines(table, columns, rows, conflict), timeout)
+
+def import_csv(sock: socket.socket, f, table: str, columns: List[str], records: List[str],
+               timeout: float, conflict: Optional[str] = None) -> Tuple[int, int]:
+    # Same server-side insert loop as bulk_insert, rows sent as CSV records (op import_csv)
+    return send_counted(sock, f, import_csv_lines(table, columns, records, conflict=conflict), timeout)
+
+def sql_quote(s: str) -> str:
+    # most values contain no apostrophe: skip the replace() copy then
+    if "'" not in s:
+        return "'" + s + "'"
+    return "'" + s.replace("'", "''") + "'"
+
+def exec_line_len(sql: str) -> int:
+    # bytes on the wire for {"op":"exec","sql":...}, trailing newline included
+    return len(json_line({"op": "exec", "sql": sql}))
+
+def insert_sql(prefix: str, table: str, cols: str, values_list: List[str], batch_size: int = 0) -> List[str]:
+    # Multi-row INSERT: groups rows into "INSERT INTO t (cols) VALUES (...),(...),...;"
+    # - batch_size <= 0 means: as many rows per statement as fit
+    # - every statement must fit in one request line on the server (fits_line)
+    head = f"{prefix} INTO {table} ({cols}) VALUES "
+    base_len = exec_line_len(head + ";")
+    out: List[str] = []
+    chunk: List[str] = []
+    chunk_len = base_len
+    for values in values_list:
+        tup = "(" + values + ")"
+        tup_len = len(json_bytes(tup)) - 2  # JSON-escaped length, without the quotes
+        full = batch_size > 0 and len(chunk) >= batch_size
+        if chunk and (full or not fits_line(chunk_len + 1 + tup_len)):
+            out.append(head + ",".join(chunk) + ";")
+            chunk = []
+            chunk_len = base_len
+        if chunk:
+            chunk_len += 1  # ","
+        chunk.append(tup)
+        chunk_len += tup_len
+    if chunk:
+        out.append(head + ",".join(chunk) + ";")
+    return out
+
+# ---------------- statements (prepare/step/finalize) ----------------
+def prepare(sock: socket.socket, f, sql: str, timeout: float = 5.0) -> Tuple[int, List[str]]:
+    log_debug(f"PREPARE: {sql}")
+    json_send(sock, {"op": "prepare", "sql": sql})
+    resp = expect_ok(json_recv_line(f, timeout, sock))
+    stmt = int(resp["stmt"])
+    cols = list(resp.get("col_names", []))
+    log_debug(f"PREPARED stmt={stmt} cols={resp.get('cols')} names={cols}")
+    return stmt, cols
+
+def step(sock: socket.socket, f, stmt: int, timeout: float = 5.0) -> Optional[List[Any]]:
+    json_send(sock, {"op": "step", "stmt": stmt, "types": False})
+    resp = expect_ok(json_recv_line(f, timeout, sock))
+    if resp.get("done"):
+        log_debug(f"STEP stmt={stmt}: done")
+        return None
+    row = resp.get("row")
+    if LOG_LEVEL >= LOG_DEBUG:  # jshort() re-encodes the row
+        log_debug(f"STEP stmt={stmt}: row={jshort(row)}")
+    return row
+
+def step_rows(sock: socket.socket, f, stmt: int, timeout: float = 5.0, window: int = 16):
+    # Generator over all rows: sends `window` step requests in one go, then drains all their responses.
+    # The server keeps answering "done" after the last row, so stepping past the end is harmless.
+    # Nothing is in flight while a row is yielded, so the caller may send other requests in between.
+    window = max(1, window)
+    req = json_line({"op": "step", "stmt": stmt, "types": False})
+    req_window = req * window
+    debug = LOG_LEVEL >= LOG_DEBUG
+    while True:
+        sock.sendall(req_window)
+        batch: List[List[Any]] = []
+        done = False
+        error: Optional[Dict[str, Any]] = None
+        # drain the whole window before raising, so no step reply is left unread for the next request
+        for _ in range(window):
+            resp = json_recv_line(f, timeout, sock)
+            if not resp["ok"]:  # expect_ok inlined; the server always sets "ok"
+                if error is None:
+                    error = resp
+            elif "done" in resp:
+                done = True
+            elif not done:
+                batch.append(resp.get("row"))
+        if error is not None:
+            raise RuntimeError(f"Server error: {error}")
+        if debug:
+            log_debug(f"STEP stmt={stmt}: {len(batch)} rows{' (done)' if done else ''}")
+        yield from batch
+        if done:
+            return
+
+def finalize(sock: socket.socket, f, stmt: int, timeout: float = 5.0) -> None:
+    log_debug(f"FINALIZE stmt={stmt}")
+    json_send(sock, {"op": "finalize", "stmt": stmt})
+    expect_ok(json_recv_line(f, timeout, sock))
+    log_debug(f"FINALIZED stmt={stmt}")
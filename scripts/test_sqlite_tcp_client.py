@@ -0,0 +1,195 @@
+# test_sqlite_tcp_client.py — pytest checks for the shared protocol layer (no ESP32 needed)
+#
+# Usage:
+#   python -m pytest scripts
+
+import json
+import socket
+
+import pytest
+
+from sqlite_tcp_client import (RX_LINE_MAX, LineReader, bulk_insert_lines, csv_records, exec_line_len,
+                               import_csv_lines, insert_sql, json_line, json_recv_line, step_rows)
+
+def server_recv_lines(stream: bytes, maxlen: int = RX_LINE_MAX):
+    # Replays recv_line() from tcp_sqlite_server.c: stores at most maxlen - 1 bytes per line;
+    # an empty line is what client_task takes for a disconnect
+    lines = []
+    pos = 0
+    while pos < len(stream):
+        buf = bytearray()
+        while len(buf) < maxlen - 1:
+            if pos >= len(stream):
+                return lines
+            ch = stream[pos]
+            pos += 1
+            if ch == 0x0A:
+                break
+            if ch == 0x0D:
+                continue
+            buf.append(ch)
+        lines.append(bytes(buf))
+    return lines
+
+def assert_server_accepts(lines):
+    # every line arrives whole, as one request, on the server
+    got = server_recv_lines(b"".join(lines))
+    assert got == [line.rstrip(b"\n") for line in lines]
+    for line in lines:
+        assert len(line) <= RX_LINE_MAX - 1
+        json.loads(line)
+
+def exec_lines(statements):
+    return [json_line({"op": "exec", "sql": sql}) for sql in statements]
+
+# ---------------- insert_sql ----------------
+HEAD = "INSERT INTO t (a) VALUES "
+
+def one_row_line_len(value: str) -> int:
+    return exec_line_len(HEAD + "(" + value + ");")
+
+def test_server_replay_cuts_long_line():
+    # the failure mode itself: 2047 chars + "\n" leaves the "\n" behind as an empty request
+    assert server_recv_lines(b"x" * 2047 + b"\n") == [b"x" * 2047, b""]
+    assert server_recv_lines(b"x" * 2046 + b"\n") == [b"x" * 2046]
+
+def test_insert_sql_single_row_on_the_limit():
+    fill = RX_LINE_MAX - 1 - one_row_line_len("''")
+    value = "'" + "x" * fill + "'"
+    assert one_row_line_len(value) == RX_LINE_MAX - 1
+    out = insert_sql("INSERT", "t", "a", [value])
+    assert out == [HEAD + "(" + value + ");"]
+    assert_server_accepts(exec_lines(out))
+
+def test_insert_sql_splits_one_byte_past_the_limit():
+    # two rows that together land exactly on RX_LINE_MAX - 1 stay in one statement,
+    # one byte more splits them
+    second = "'y'"
+    pair_extra = len(",(" + second + ")")
+    fill = RX_LINE_MAX - 1 - one_row_line_len("''") - pair_extra
+    first = "'" + "x" * fill + "'"
+    assert len(insert_sql("INSERT", "t", "a", [first, second])) == 1
+    first = "'" + "x" * (fill + 1) + "'"
+    out = insert_sql("INSERT", "t", "a", [first, second])
+    assert len(out) == 2
+    assert_server_accepts(exec_lines(out))
+
+def test_insert_sql_sweep_stays_within_limit():
+    # rows of every width, escaping and multi-byte UTF-8 included: statements are packed
+    # up to, never past, the limit
+    for width in range(1, 80):
+        values = ["%d,'%s'" % (i, ("a\"\\é" * width)[:width]) for i in range(200)]
+        lines = exec_lines(insert_sql("INSERT", "t", "a,b", values))
+        assert_server_accepts(lines)
+        widest = max(len(json_line({"sql": ",(" + v + ")"})) for v in values) - len(json_line({"sql": ""}))
+        for line in lines[:-1]:
+            assert len(line) + widest > RX_LINE_MAX - 1
+
+def test_insert_sql_batch_size():
+    out = insert_sql("INSERT OR IGNORE", "t", "a", [str(i) for i in range(5)], batch_size=2)
+    assert out == ["INSERT OR IGNORE INTO t (a) VALUES (0),(1);",
+                   "INSERT OR IGNORE INTO t (a) VALUES (2),(3);",
+                   "INSERT OR IGNORE INTO t (a) VALUES (4);"]
+
+# ---------------- import_csv_lines / bulk_insert_lines ----------------
+COLUMNS = ["a", "b"]
+
+def test_import_csv_two_records_on_the_limit():
+    base = len(import_csv_lines("t", COLUMNS, ["x\n", "y\n"])[0])
+    first = "x" * (RX_LINE_MAX - 1 - base + 1) + "\n"
+    lines = import_csv_lines("t", COLUMNS, [first, "y\n"])
+    assert len(lines) == 1 and len(lines[0]) == RX_LINE_MAX - 1
+    lines = import_csv_lines("t", COLUMNS, ["x" + first, "y\n"])
+    assert len(lines) == 2
+    assert_server_accepts(lines)
+
+def test_bulk_insert_two_rows_on_the_limit():
+    base = len(bulk_insert_lines("t", COLUMNS, [(1, ""), (2, "")])[0])
+    fill = RX_LINE_MAX - 1 - base
+    lines = bulk_insert_lines("t", COLUMNS, [(1, "x" * fill), (2, "")])
+    assert len(lines) == 1 and len(lines[0]) == RX_LINE_MAX - 1
+    lines = bulk_insert_lines("t", COLUMNS, [(1, "x" * (fill + 1)), (2, "")])
+    assert len(lines) == 2
+    assert_server_accepts(lines)
+
+def test_row_splitters_sweep_stay_within_limit():
+    # every row is sent exactly once, in order, whatever the split
+    for width in range(1, 80):
+        rows = [(i, ("a,\"\\é\n" * width)[:width]) for i in range(200)]
+        lines = bulk_insert_lines("t", COLUMNS, rows, conflict="ignore")
+        assert_server_accepts(lines)
+        assert [tuple(r) for line in lines for r in json.loads(line)["rows"]] == rows
+        for delim in (",", ";"):
+            records = csv_records(rows, delim)
+            lines = import_csv_lines("t", COLUMNS, records, delim=delim)
+            assert_server_accepts(lines)
+            assert "".join(json.loads(line)["csv"] for line in lines) == "".join(records)
+
+# ---------------- LineReader ----------------
+class ChunkedSock:
+    # recv_into() hands out the given pieces one per call, then EOF
+    def __init__(self, pieces):
+        self.pieces = list(pieces)
+
+    def recv_into(self, view):
+        if not self.pieces:
+            return 0
+        piece = self.pieces.pop(0)
+        n = min(len(piece), len(view))
+        view[:n] = piece[:n]
+        if n < len(piece):
+            self.pieces.insert(0, piece[n:])
+        return n
+
+def test_line_reader_partial_lines():
+    f = LineReader(ChunkedSock([b"ab", b"c\nde", b"f\n\ngh", b"i\n"]), bufsize=16)
+    assert [f.readline() for _ in range(4)] == [b"abc\n", b"def\n", b"\n", b"ghi\n"]
+
+def test_line_reader_grows_for_long_lines():
+    long_line = b"x" * 100 + b"\n"
+    f = LineReader(ChunkedSock([b"ab\n", long_line[:50], long_line[50:] + b"cd\n"]), bufsize=8)
+    assert f.readline() == b"ab\n"
+    assert f.readline() == long_line
+    assert f.readline() == b"cd\n"
+    assert len(f.buf) >= len(long_line)
+
+def test_line_reader_eof():
+    f = LineReader(ChunkedSock([b"ab\ncd"]), bufsize=16)
+    assert f.readline() == b"ab\n"
+    assert f.readline() == b"cd"  # unterminated tail
+    assert f.readline() == b""
+    assert f.readline() == b""
+
+# ---------------- step_rows ----------------
+@pytest.fixture
+def conn():
+    client, server = socket.socketpair()
+    client.settimeout(2)
+    yield client, server
+    client.close()
+    server.close()
+
+def reply(server, *objs):
+    server.sendall(b"".join(json_line(o) for o in objs))
+
+def row(*values):
+    return {"ok": True, "row": list(values)}
+
+def test_step_rows_all_rows_then_done(conn):
+    client, server = conn
+    reply(server, row(1), row(2), row(3), row(4), row(5), {"ok": True, "done": True},
+          {"ok": True, "done": True}, {"ok": True, "done": True})
+    f = LineReader(client)
+    assert list(step_rows(client, f, 7, timeout=2, window=4)) == [[1], [2], [3], [4], [5]]
+    sent = server.recv(65536).splitlines()  # two windows
+    assert len(sent) == 8 and all(json.loads(r) == {"op": "step", "stmt": 7, "types": False} for r in sent)
+
+def test_step_rows_drains_window_before_raising(conn):
+    client, server = conn
+    error = {"ok": False, "error": {"code": 404, "message": "unknown stmt"}}
+    reply(server, row(1), error, error, {"ok": True, "done": True}, {"ok": True, "pong": True})
+    f = LineReader(client)
+    with pytest.raises(RuntimeError, match="unknown stmt"):
+        list(step_rows(client, f, 7, timeout=2, window=4))
+    # the reply after the window belongs to the next request, nothing of the window is left over
+    assert json_recv_line(f, 2, client) == {"ok": True, "pong": True}
@@ -18,21 +18,21 @@ def upload_littlefs(source, target, env):
   platform = env.PioPlatform()
   board = env.BoardConfig()
   
-  #-- Build the filesystem image first
-  print("\n[1/2] Building filesystem image from 'data' folder...")
-  ret = env.Execute("pio run --target buildfs --environment " + env["PIOENV"])
+  #-- Build and upload the filesystem image in one PlatformIO run: one SCons
+  #   session (platformio.ini parsed and environment resolved once) instead of two
+  print("\nBuilding filesystem image from 'data' folder and uploading it to ESP32...")
+  ret = env.Execute("pio run --target buildfs --target uploadfs --environment " + env["PIOENV"])
   
   if ret != 0:
-    print("ERROR: Failed to build filesystem image")
+    print("ERROR: Failed to build or upload filesystem image")
     sys.exit(1)
   
-  #-- Upload the filesystem image
-  print("\n[2/2] Uploading filesystem image to ESP32...")
-  ret = env.Execute("pio run --target uploadfs --environment " + env["PIOENV"])
-  
-  if ret != 0:
-    print("ERROR: Failed to upload filesystem image")
-    sys.exit(1)
+  #-- The new image replaced every file on the ESP32: forget what upload_web_files.py
+  #   recorded as uploaded, so its next run sends everything again
+  manifest = os.path.join(env["PROJECT_DIR"], ".upload_manifest.json")
+  if os.path.exists(manifest):
+    os.remove(manifest)
+    print("Cleared " + manifest)
   
   print("\n" + "=" * 60)
   print("LittleFS upload completed successfully!")
@@ -3,79 +3,279 @@
 import os
 import sys
 import json
+import base64
+import gzip
+import hashlib
 import http.client
+import socket
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    import orjson  # optional: escapes large assets several times faster than json
+except ImportError:
+    orjson = None
+
 ESP32_IP = "192.168.12.14"   # Change to your ESP32's IP
 ESP32_PORT = 8080
 DATA_DIR = "data"
+READ_CHUNK = 16384             # characters read from a file per step
+B64_CHUNK = 3 * 16384          # bytes per base64 step (multiple of 3: no padding mid-stream)
+GZIP_EXTS = {".html", ".htm", ".css", ".js", ".svg", ".json"}  # with --gzip: sent as <name>.gz
+GZIP_MIN_SIZE = 256            # smaller files stay plain, the gzip header would outweigh the gain
+SEND_BUFFER = 262144           # SO_SNDBUF of the upload socket
+RESPONSE_KEEP = 4096           # response bytes kept for the result line, the rest is discarded
+# State files go in the project root (the parent of scripts/), next to data/ and not in the
+# working directory: they stay out of the filesystem image, and upload_littlefs.py/upload_spiffs.py
+# find the manifest there to delete it after uploadfs (the hash cache is keyed by absolute path)
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MANIFEST_FILE = os.path.join(PROJECT_DIR, ".upload_manifest.json")  # {esp_ip: {web_path: sha256}} of the last uploads
+HASH_CACHE_FILE = os.path.join(PROJECT_DIR, ".upload_cache.json")  # {abspath: [mtime_ns, size, sha256]}:
+                                         # no re-hashing of files that did not change on disk
+
 
+if orjson is not None:
+    def json_str_bytes(text):
+        """text as the UTF-8 bytes of a JSON string literal, without the quotes"""
+        return orjson.dumps(text)[1:-1]
+else:
+    def json_str_bytes(text):
+        """text as the UTF-8 bytes of a JSON string literal, without the quotes"""
+        return json.dumps(text, ensure_ascii=False)[1:-1].encode("utf-8")
 
-def escape_json_string(s):
-    """Escape string for JSON"""
-    return (
-        s.replace('\\', '\\\\')
-         .replace('"', '\\"')
-         .replace('\n', '\\n')
-         .replace('\r', '\\r')
-         .replace('\t', '\\t')
-    )
 
+def json_body_chunks(filepath, web_path):
+    """Build the JSON upload body as a list of byte chunks, reading the file piecewise"""
 
-def upload_file(ip, port, filepath, web_path):
-    """Upload a file to ESP32 via HTTP POST (no requests module)"""
+    # -- json_str_bytes escapes in one C pass, control characters included; escaping is
+    #    per character, so chunk by chunk gives the same bytes as the whole content at
+    #    once (text mode reads whole characters). Non-ASCII stays plain UTF-8.
+    head = '{"path": ' + json.dumps(web_path, ensure_ascii=False) + ', "content": "'
+    chunks = [head.encode("utf-8")]
 
-    # -- Read file content
     with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
+        while True:
+            text = f.read(READ_CHUNK)
+            if not text:
+                break
+            chunks.append(json_str_bytes(text))
+
+    chunks.append(b'"}')
+    return chunks
+
+
+def read_blocks(filepath):
+    """Yield a file's bytes in B64_CHUNK sized blocks"""
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(B64_CHUNK), b''):
+            yield block
+
+
+class B64Body:
+    """JSON upload body with base64 content, streamed while it is sent
+
+    Base64 output length follows from the input size alone, so Content-Length is
+    known without building the body; blocks() is called per send (iteration),
+    which keeps the body reusable for a retry."""
+
+    def __init__(self, web_path, size, blocks):
+        # -- ~1.33x the content size, instead of failing on bytes that are not UTF-8 text
+        head = '{"path": ' + json.dumps(web_path, ensure_ascii=False) + ', "enc": "b64", "content": "'
+        self.head = head.encode("utf-8")
+        self.blocks = blocks
+        self.content_length = len(self.head) + 4 * ((size + 2) // 3) + 2
+
+    def __iter__(self):
+        yield self.head
+        for raw in self.blocks():
+            yield base64.b64encode(raw)
+        yield b'"}'
+
+
+def b64_file_body(filepath, web_path):
+    return B64Body(web_path, os.path.getsize(filepath), lambda: read_blocks(filepath))
+
 
-    # -- Escape content for JSON
-    content_escaped = escape_json_string(content)
+def gzip_body(filepath, web_path):
+    """Gzip a file (level 9, mtime 0 so equal input gives equal bytes) into a B64Body"""
+    with open(filepath, 'rb') as f:
+        data = gzip.compress(f.read(), 9, mtime=0)
+    return B64Body(web_path, len(data),
+                   lambda: (data[i:i + B64_CHUNK] for i in range(0, len(data), B64_CHUNK)))
 
-    # -- Build JSON payload
-    payload = {
-        "path": web_path,
-        "content": content_escaped
-    }
 
-    body = json.dumps(payload).encode("utf-8")
+def file_sha256(filepath):
+    """SHA-256 hex digest of a file, read in chunks"""
+    h = hashlib.sha256()
+    for block in read_blocks(filepath):
+        h.update(block)
+    return h.hexdigest()
 
-    headers = {
-        "Content-Type": "application/json",
-        "Content-Length": str(len(body))
-    }
 
+def cached_sha256(filepath, hashes):
+    """file_sha256() with a local cache: absolute path -> [mtime_ns, size, sha256]
+
+    A file whose mtime and size still match its entry is only stat()ed, not read."""
+    key = os.path.abspath(filepath)
+    st = os.stat(filepath)
+    entry = hashes.get(key)
+    if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+        return entry[2]
+    digest = file_sha256(filepath)
+    hashes[key] = [st.st_mtime_ns, st.st_size, digest]
+    return digest
+
+
+def load_json_state(path):
+    """Saved state from the last runs, empty when missing or unreadable"""
     try:
-        conn = http.client.HTTPConnection(ip, port, timeout=10)
-        conn.request("POST", "/upload", body=body, headers=headers)
-
-        response = conn.getresponse()
-        response_body = response.read().decode("utf-8", errors="replace")
-
-        if response.status == 200:
-            try:
-                result = json.loads(response_body)
-                print(f"✓ {web_path} ({result.get('bytes', 0)} bytes)")
-            except json.JSONDecodeError:
-                print(f"✓ {web_path} (uploaded)")
-            return True
-        else:
-            print(f"✗ {web_path} - HTTP {response.status}: {response_body}")
-            return False
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-    except Exception as e:
-        print(f"✗ {web_path} - Error: {e}")
-        return False
 
-    finally:
+def save_json_state(path, state):
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=1, sort_keys=True)
+    except OSError as e:
+        print(f"Warning: cannot write {path}: {e}")
+
+
+# -- Same for every upload, only Content-Length is added per file
+UPLOAD_HEADERS = {
+    "Content-Type": "application/json",
+    "Connection": "keep-alive"
+}
+
+
+class UploadConnection(http.client.HTTPConnection):
+    """HTTPConnection with socket options for streaming bodies to the ESP32
+
+    http.client sends the headers and each body chunk with separate writes; with
+    Nagle on, the first chunk waits for the ESP32 to ACK the headers (delayed ACK),
+    once per file. TCP_NODELAY sends it at once, and a bigger send buffer lets a
+    whole chunk (up to 64 KiB of base64) be queued in one write."""
+
+    def connect(self):
+        super().connect()
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+
+
+def build_body(filepath, web_path, gzipped=False, b64=False):
+    """Build the upload body for a file, returns (body, content_length)"""
+
+    # -- Body is sent chunk by chunk with a known Content-Length: the file content
+    #    is never held as str + escaped str + JSON str + bytes at the same time.
+    #    Base64 bodies are not built at all beforehand, their length is computed.
+    if gzipped:
+        body = gzip_body(filepath, web_path)
+    else:
         try:
+            body = json_body_chunks(filepath, web_path)
+        except UnicodeDecodeError:
+            # -- not UTF-8 text: binary asset, only sent when the handler decodes "enc": "b64"
+            if not b64:
+                raise
+            body = b64_file_body(filepath, web_path)
+    if isinstance(body, B64Body):
+        return body, body.content_length
+    return body, sum(len(c) for c in body)
+
+
+def prepare_file(filepath, rel_path, use_gzip, use_b64, known, hashes):
+    """Hash a file and build its body; runs on the read-ahead thread
+
+    Returns (web_path, digest, body, length, error). body is None when the
+    digest equals known[web_path] (unchanged) or when error is set."""
+    web_path = f"/web/{rel_path}"
+    try:
+        gzipped = (use_gzip and os.path.splitext(filepath)[1].lower() in GZIP_EXTS
+                   and os.path.getsize(filepath) >= GZIP_MIN_SIZE)
+        if gzipped:
+            web_path += ".gz"
+        digest = cached_sha256(filepath, hashes)
+        if known.get(web_path) == digest:
+            return web_path, digest, None, 0, None
+        body, length = build_body(filepath, web_path, gzipped, use_b64)
+        return web_path, digest, body, length, None
+    except (OSError, UnicodeDecodeError) as e:
+        return web_path, None, None, 0, str(e)
+
+
+def upload_file(conn, web_path, body, length):
+    """Upload a prepared body to ESP32 via HTTP POST on a shared keep-alive connection"""
+
+    headers = UPLOAD_HEADERS.copy()
+    headers["Content-Length"] = str(length)
+
+    # -- The ESP32 may close an idle keep-alive socket between two files; an upload
+    #    overwrites the file, so sending it once more on a fresh connection is safe
+    for attempt in (1, 2):
+        try:
+            conn.request("POST", "/upload", body=body, headers=headers)
+
+            # -- keep at most RESPONSE_KEEP bytes (the JSON status, or the start of an
+            #    error page) and drain the rest: the next request reuses this socket
+            response = conn.getresponse()
+            response_body = response.read(RESPONSE_KEEP).decode("utf-8", errors="replace")
+            while response.read(RESPONSE_KEEP):
+                pass
+            break
+
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+            conn.close()  # next request() reconnects
+            if attempt == 2:
+                print(f"✗ {web_path} - Error: {e}")
+                return False
+
+        except Exception as e:
             conn.close()
-        except Exception:
-            pass
+            print(f"✗ {web_path} - Error: {e}")
+            return False
+
+    if response.status == 200:
+        try:
+            result = json.loads(response_body)
+            print(f"✓ {web_path} ({result.get('bytes', 0)} bytes)")
+        except json.JSONDecodeError:
+            print(f"✓ {web_path} (uploaded)")
+        return True
+    else:
+        print(f"✗ {web_path} - HTTP {response.status}: {response_body}")
+        return False
+
+
+def walk_files(directory, rel_prefix=""):
+    """Yield (filepath, rel_path) for all non-hidden files below directory
+
+    os.scandir() entries know their type from the directory listing, so there is
+    no stat() per file; rel_path is built as the walk goes, with "/" separators
+    as used in web paths on every OS."""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk_files(entry.path, rel_prefix + entry.name + "/")
+            elif entry.is_file() and not entry.name.startswith('.'):
+                yield entry.path, rel_prefix + entry.name
 
 
 def main():
-    esp_ip = sys.argv[1] if len(sys.argv) > 1 else ESP32_IP
+    # -- usage: upload_web_files.py [esp_ip] [--force] [--gzip] [--b64]
+    #    --force uploads every file, also the ones unchanged since the last upload
+    #    --b64   uploads non-UTF-8 files (images, fonts, .gz) as "enc": "b64"; only for
+    #            an /upload handler that decodes it (otherwise they fail, as before)
+    #    --gzip  uploads GZIP_EXTS files gzipped as <name>.gz (3-5x smaller for
+    #            html/css/js), also as "enc": "b64"; the web server must decode those
+    #            and serve them with Content-Encoding: gzip
+    flags = {a for a in sys.argv[1:] if a.startswith("--")}
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    force = "--force" in flags
+    use_gzip = "--gzip" in flags
+    use_b64 = "--b64" in flags
+    esp_ip = args[0] if args else ESP32_IP
 
     print("=" * 60)
     print(f"Uploading web files to ESP32 at {esp_ip}:{ESP32_PORT}")
@@ -86,11 +286,7 @@ def main():
         sys.exit(1)
 
     # -- Find all files in data/ directory
-    files = []
-    for root, dirs, filenames in os.walk(DATA_DIR):
-        for filename in filenames:
-            if not filename.startswith('.'):
-                files.append(os.path.join(root, filename))
+    files = list(walk_files(DATA_DIR))
 
     if not files:
         print(f"No files found in {DATA_DIR}/ directory")
@@ -100,18 +296,52 @@ def main():
 
     success_count = 0
     fail_count = 0
+    skip_count = 0
 
-    for filepath in files:
-        rel_path = os.path.relpath(filepath, DATA_DIR)
-        web_path = f"/web/{rel_path}"
+    # -- Files whose hash matches the last successful upload to this ESP32 are skipped:
+    #    no transfer and no flash write. The record lives on this side only; after
+    #    erasing/reflashing the filesystem, run with --force.
+    manifest = load_json_state(MANIFEST_FILE)
+    uploaded = manifest.setdefault(esp_ip, {})
+    hashes = load_json_state(HASH_CACHE_FILE)
 
-        if upload_file(esp_ip, ESP32_PORT, filepath, web_path):
-            success_count += 1
-        else:
-            fail_count += 1
+    # -- One connection for all files: one TCP setup instead of one per file.
+    #    A single read-ahead thread hashes and builds the body of the next file
+    #    while the current one is on the wire (at most two bodies in memory).
+    conn = UploadConnection(esp_ip, ESP32_PORT, timeout=10)
+    known = {} if force else uploaded
+    try:
+        with ThreadPoolExecutor(max_workers=1) as ex:
+            pending = ex.submit(prepare_file, *files[0], use_gzip, use_b64, known, hashes)
+            for i in range(len(files)):
+                web_path, digest, body, length, error = pending.result()
+                if i + 1 < len(files):
+                    pending = ex.submit(prepare_file, *files[i + 1], use_gzip, use_b64, known, hashes)
+
+                if error is not None:
+                    print(f"✗ {web_path} - Error: {error}")
+                    uploaded.pop(web_path, None)
+                    fail_count += 1
+                elif body is None:
+                    print(f"= {web_path} (unchanged)")
+                    skip_count += 1
+                elif upload_file(conn, web_path, body, length):
+                    uploaded[web_path] = digest
+                    success_count += 1
+                else:
+                    uploaded.pop(web_path, None)
+                    fail_count += 1
+    finally:
+        conn.close()
+        save_json_state(MANIFEST_FILE, manifest)
+        # -- only files that still exist keep their cache entry
+        live = {os.path.abspath(fp) for fp, _ in files}
+        save_json_state(HASH_CACHE_FILE, {fp: entry for fp, entry in hashes.items() if fp in live})
 
     print("\n" + "=" * 60)
-    print(f"Upload complete: {success_count} succeeded, {fail_count} failed")
+    print(f"Upload complete: {success_count} succeeded, {skip_count} unchanged, {fail_count} failed")
+    if skip_count:
+        print(f"{skip_count} file(s) skipped as unchanged (use --force after erasing the filesystem)")
     print("=" * 60)
 
     if fail_count > 0: